@@ -0,0 +1,16 @@
+"""
+Celery application for alx_travel_app project.
+
+Configuration is read from Django settings using the ``CELERY_`` prefix and
+tasks are discovered from each installed app's ``tasks.py``.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings')
+
+app = Celery('alx_travel_app')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -59,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'listings.throttling.ConcurrencyLimitMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -103,6 +104,22 @@ DATABASES = {
     }
 }
 
+# Archived bookings can be moved to their own database by adding it to
+# DATABASES and pointing BOOKING_ARCHIVE_DATABASE at its alias
+DATABASE_ROUTERS = ['listings.routers.BookingArchiveRouter']
+BOOKING_ARCHIVE_DATABASE = env('BOOKING_ARCHIVE_DATABASE', default='default')
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Rankings and shared throttle buckets must be visible to every worker, so the
+# default is a database table (python manage.py createcachetable) rather than
+# per-process memory; point CACHE_URL at redis:// or pymemcache:// in production.
+# The database cache culls entries in key order once it holds max_entries (300
+# unless set), which would evict rankings and throttle buckets first
+CACHES = {
+    'default': env.cache('CACHE_URL', default='dbcache://django_cache?max_entries=100000'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,9 +168,35 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # Trusted reverse proxies in front of the app. Throttles identify clients by
+    # REMOTE_ADDR when 0, otherwise by the X-Forwarded-For entry that many hops back;
+    # left unset, DRF would trust the whole client-supplied X-Forwarded-For header
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
+    'DEFAULT_THROTTLE_CLASSES': [
+        'listings.throttling.TokenBucketThrottle',
+    ],
+    # Token bucket per client and endpoint class: 'N/period' allows bursts of N
+    'DEFAULT_THROTTLE_RATES': {
+        'default': env('THROTTLE_RATE_DEFAULT', default='300/min'),
+        'search': env('THROTTLE_RATE_SEARCH', default='120/min'),
+        'booking_write': env('THROTTLE_RATE_BOOKING_WRITE', default='20/min'),
+        'bulk_import': env('THROTTLE_RATE_BULK_IMPORT', default='10/hour'),
+    },
 }
 
+# Throttle bucket storage: 'local' (per process) or 'cache' (shared Django cache)
+THROTTLE_BACKEND = env('THROTTLE_BACKEND', default='local')
+THROTTLE_CACHE_ALIAS = env('THROTTLE_CACHE_ALIAS', default='default')
+
+# Unauthenticated POST /api/bookings/ and /api/reviews/ for load_test's write
+# operations; never enable on a public deployment
+LOAD_TEST_ENDPOINTS = env.bool('LOAD_TEST_ENDPOINTS', default=False)
+
+# Admission control: requests served at once per process before shedding with 503
+MAX_CONCURRENT_REQUESTS = env.int('MAX_CONCURRENT_REQUESTS', default=64)
+CONCURRENCY_QUEUE_TIMEOUT = env.float('CONCURRENCY_QUEUE_TIMEOUT', default=0.5)
+
 # CORS configuration
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=[
     "http://localhost:3000",
@@ -178,3 +221,52 @@ REDOC_SETTINGS = {
     'LAZY_RENDERING': False,
 }
 
+# Celery configuration
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='amqp://localhost')
+CELERY_TIMEZONE = TIME_ZONE
+
+CELERY_BEAT_SCHEDULE = {
+    'update-booking-statuses': {
+        'task': 'listings.tasks.update_booking_statuses',
+        'schedule': env.int('BOOKING_LIFECYCLE_INTERVAL', default=15 * 60),
+    },
+    'refresh-rankings': {
+        'task': 'listings.tasks.refresh_rankings',
+        'schedule': env.int('RANKING_REFRESH_INTERVAL', default=60),
+    },
+    'archive-bookings': {
+        'task': 'listings.tasks.archive_bookings',
+        'schedule': env.int('BOOKING_ARCHIVE_INTERVAL', default=24 * 60 * 60),
+    },
+    'reconcile-listing-counters': {
+        'task': 'listings.tasks.reconcile_listing_counters',
+        'schedule': env.int('LISTING_COUNTERS_RECONCILE_INTERVAL', default=24 * 60 * 60),
+    },
+}
+
+# Booking lifecycle
+BOOKING_PENDING_TTL_HOURS = env.int('BOOKING_PENDING_TTL_HOURS', default=24)
+BOOKING_LIFECYCLE_BATCH_SIZE = env.int('BOOKING_LIFECYCLE_BATCH_SIZE', default=500)
+
+# Booking archival: finished bookings with an older check-in leave the hot table
+BOOKING_ARCHIVE_MONTHS = env.int('BOOKING_ARCHIVE_MONTHS', default=12)
+
+# Listing catalog snapshot
+LISTING_CATALOG_REFRESH_SECONDS = env.int('LISTING_CATALOG_REFRESH_SECONDS', default=30)
+
+# Top-rated and trending rankings
+RANKING_TOP_N = env.int('RANKING_TOP_N', default=10)
+RANKING_PRIOR_REVIEWS = env.int('RANKING_PRIOR_REVIEWS', default=10)
+RANKING_VELOCITY_HALF_LIFE_DAYS = env.int('RANKING_VELOCITY_HALF_LIFE_DAYS', default=7)
+RANKING_VELOCITY_WINDOW_DAYS = env.int('RANKING_VELOCITY_WINDOW_DAYS', default=30)
+RANKING_MAX_STALENESS = env.int('RANKING_MAX_STALENESS', default=300)
+RANKING_DIRTY_FLUSH_INTERVAL = env.float('RANKING_DIRTY_FLUSH_INTERVAL', default=1.0)
+
+# Listing counter write coalescing
+LISTING_COUNTERS_BUFFERED = env.bool('LISTING_COUNTERS_BUFFERED', default=True)
+LISTING_COUNTERS_FLUSH_INTERVAL = env.float('LISTING_COUNTERS_FLUSH_INTERVAL', default=1.0)
+LISTING_COUNTERS_MAX_PENDING = env.int('LISTING_COUNTERS_MAX_PENDING', default=1000)
+
+# Listing view and search impression tracking
+IMPRESSIONS_BUFFER_SIZE = env.int('IMPRESSIONS_BUFFER_SIZE', default=100000)
+IMPRESSIONS_FLUSH_INTERVAL = env.float('IMPRESSIONS_FLUSH_INTERVAL', default=5.0)
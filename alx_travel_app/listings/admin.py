@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Listing, Booking, Review
+from .models import Listing, Booking, ArchivedBooking, Review, normalize_guest_email
 
 # Register your models here.
 @admin.register(Listing)
@@ -16,6 +16,24 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ('guest_name', 'listing__title', 'listing__host_name')
     readonly_fields = ('created_at', 'updated_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Email searches use the guest_email index instead of scanning with icontains
+        if '@' in search_term:
+            return queryset.filter(guest_email=normalize_guest_email(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ('id', 'listing_id', 'guest_name', 'check_in', 'check_out', 'status', 'archived_at')
+    list_filter = ('status', 'check_in')
+    search_fields = ('=guest_email',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('listing', 'reviewer_name', 'rating', 'created_at')
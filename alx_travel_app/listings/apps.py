@@ -5,3 +5,7 @@ class ListingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listings'
 
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
+
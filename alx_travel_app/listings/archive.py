@@ -0,0 +1,111 @@
+"""
+Archival of finished bookings and date-range queries across hot and archived rows.
+
+Completed and cancelled bookings whose check-in is older than a cutoff are
+moved in batches from the Booking table to ArchivedBooking, which may live
+in a separate database. Each batch is copied first (ignoring rows already
+present) and only then deleted from the hot table, so an interrupted run
+leaves no booking behind and can simply be repeated.
+
+``bookings_in_range()`` serves date-range reads: it always queries the hot
+table and reaches into the archive only when the range starts before the
+newest archived check-in. Availability checks never need the archive, since
+only pending and confirmed bookings hold dates and those are never archived.
+"""
+import calendar
+from datetime import date
+
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ArchivedBooking, Booking
+
+
+ARCHIVABLE_STATUSES = ['completed', 'cancelled']
+DEFAULT_BATCH_SIZE = 1000
+
+
+def archive_cutoff(months, today=None):
+    """First check-in date that stays in the hot table when keeping ``months`` months."""
+    today = today or timezone.localdate()
+    month = today.month - months
+    year = today.year + (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    # Clamp the day for shorter months, e.g. 31 March minus one month
+    day = min(today.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def archive_bookings(months, batch_size=DEFAULT_BATCH_SIZE, today=None):
+    """
+    Move finished bookings with a check-in older than ``months`` months to the archive.
+
+    Returns the number of bookings moved.
+    """
+    cutoff = archive_cutoff(months, today)
+    candidates = Booking.objects.filter(
+        status__in=ARCHIVABLE_STATUSES, check_in__lt=cutoff
+    ).order_by('pk')
+    hot_db = router.db_for_write(Booking)
+    archive_db = router.db_for_write(ArchivedBooking)
+
+    moved = 0
+    while True:
+        batch = list(candidates[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic(using=archive_db):
+            ArchivedBooking.objects.bulk_create(
+                [ArchivedBooking.from_booking(booking) for booking in batch],
+                ignore_conflicts=True,
+            )
+        # Deleted with plain SQL: the rows are already copied, and per-row
+        # delete signals would load every booking's listing for nothing
+        ids = [booking.pk for booking in batch]
+        with transaction.atomic(using=hot_db), connections[hot_db].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Booking._meta.db_table} WHERE id IN '
+                f'({", ".join(["%s"] * len(ids))})',
+                ids,
+            )
+        moved += len(ids)
+        if len(batch) < batch_size:
+            break
+    return moved
+
+
+def archive_horizon():
+    """
+    Newest check-in date held by the archive, or None while it is empty.
+
+    Not cached: a stale value would hide freshly archived rows, and the
+    check_in index answers MAX() with a single lookup.
+    """
+    return ArchivedBooking.objects.aggregate(latest=Max('check_in'))['latest']
+
+
+def bookings_in_range(start=None, end=None, **filters):
+    """
+    Bookings with a check-in in [start, end), from the hot table and the archive.
+
+    ``filters`` are extra lookups applied to both tables (e.g. listing_id,
+    status). Archived rows come back as unsaved Booking instances with
+    ``archived = True``. Results are ordered by check-in, then id.
+    """
+    lookups = dict(filters)
+    if start is not None:
+        lookups['check_in__gte'] = start
+    if end is not None:
+        lookups['check_in__lt'] = end
+
+    results = list(Booking.objects.filter(**lookups).order_by('check_in', 'id'))
+    for booking in results:
+        booking.archived = False
+
+    horizon = archive_horizon()
+    if horizon is not None and (start is None or start <= horizon):
+        archived = ArchivedBooking.objects.filter(**lookups).order_by('check_in', 'id')
+        results.extend(row.as_booking() for row in archived)
+        results.sort(key=lambda booking: (booking.check_in, booking.id))
+    return results
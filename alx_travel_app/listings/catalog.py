@@ -0,0 +1,270 @@
+"""
+Per-process columnar snapshot of the listing catalog for hot search paths.
+
+Search only ever filters and sorts on a handful of Listing columns, so instead
+of building model instances for every row on every request the catalog keeps
+those columns as NumPy arrays, with neighborhood and room type interned as
+small integer codes. Filters become vectorized masks and sorting a single
+lexsort; only the ids of the selected page go back to the database.
+
+Snapshots are immutable. A refresh reads rows whose ``updated_at`` moved past
+the current snapshot's watermark (minus a small overlap for transactions that
+committed late), merges them into a new snapshot and swaps it in with a single
+assignment, so readers never observe a half-built catalog.
+Deletions don't touch ``updated_at``; after the merge the snapshot's row
+count and sum of ids are compared with the table's, and any mismatch
+triggers a full rebuild instead. Ids only grow, so a deletion offset by an
+insertion in the same window still changes the sum.
+"""
+import copy
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Sum
+
+from .models import Listing
+
+
+DEFAULT_REFRESH_SECONDS = 30
+
+# Rows committed slightly after a refresh may carry an earlier updated_at
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+CATALOG_FIELDS = [
+    'id', 'neighborhood', 'room_type', 'price', 'accommodates',
+    'review_scores_rating', 'latitude', 'longitude', 'updated_at',
+]
+
+# Sort keys supported by ListingCatalog.search(); ties are broken by id
+SORT_ORDERS = ['price', '-price', '-rating', 'id']
+
+
+class ListingCatalog:
+    """
+    Immutable columnar snapshot of the searchable Listing columns.
+    """
+
+    def __init__(self, ids, neighborhood_codes, room_type_codes, price, accommodates,
+                 rating, latitude, longitude, neighborhoods, room_types, watermark):
+        self.ids = ids
+        self.neighborhood_codes = neighborhood_codes
+        self.room_type_codes = room_type_codes
+        self.price = price
+        self.accommodates = accommodates
+        self.rating = rating
+        self.latitude = latitude
+        self.longitude = longitude
+        # Code -> value vocabularies for the interned string columns
+        self.neighborhoods = neighborhoods
+        self.room_types = room_types
+        self.watermark = watermark
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls):
+        """A catalog with no rows, used as the base for a full build."""
+        return cls(
+            ids=np.empty(0, dtype=np.int64),
+            neighborhood_codes=np.empty(0, dtype=np.int32),
+            room_type_codes=np.empty(0, dtype=np.int8),
+            price=np.empty(0, dtype=np.float64),
+            accommodates=np.empty(0, dtype=np.int32),
+            rating=np.empty(0, dtype=np.float64),
+            latitude=np.empty(0, dtype=np.float64),
+            longitude=np.empty(0, dtype=np.float64),
+            neighborhoods=(),
+            room_types=(),
+            watermark=None,
+        )
+
+    @classmethod
+    def build(cls):
+        """Load a full snapshot of the catalog."""
+        return cls.empty().merge(Listing.objects.all())
+
+    def refreshed(self):
+        """Return a snapshot that includes every listing changed since this one."""
+        if self.watermark is None:
+            return self.build()
+        changed = Listing.objects.filter(updated_at__gte=self.watermark - WATERMARK_OVERLAP)
+        catalog = self.merge(changed)
+        totals = Listing.objects.aggregate(count=Count('id'), id_sum=Sum('id'))
+        if (len(catalog), int(catalog.ids.sum())) != (totals['count'], totals['id_sum'] or 0):
+            return self.build()
+        return catalog
+
+    def merge(self, queryset):
+        """Return a new snapshot with the rows of ``queryset`` upserted by id."""
+        rows = list(queryset.order_by().values_list(*CATALOG_FIELDS))
+        if not rows:
+            catalog = copy.copy(self)
+            catalog.built_at = time.monotonic()
+            return catalog
+        columns = list(zip(*rows))
+        neighborhoods, neighborhood_codes = _intern(self.neighborhoods, columns[1])
+        room_types, room_type_codes = _intern(self.room_types, columns[2])
+        changed_ids = np.array(columns[0], dtype=np.int64)
+
+        keep = ~np.isin(self.ids, changed_ids)
+        ids = np.concatenate([self.ids[keep], changed_ids])
+        order = np.argsort(ids, kind='stable')
+
+        def combine(old, new, dtype):
+            return np.concatenate([old[keep], np.array(new, dtype=dtype)])[order]
+
+        return ListingCatalog(
+            ids=ids[order],
+            neighborhood_codes=combine(self.neighborhood_codes, neighborhood_codes, np.int32),
+            room_type_codes=combine(self.room_type_codes, room_type_codes, np.int8),
+            price=combine(self.price, columns[3], np.float64),
+            accommodates=combine(self.accommodates, columns[4], np.int32),
+            rating=combine(self.rating, columns[5], np.float64),
+            latitude=combine(self.latitude, columns[6], np.float64),
+            longitude=combine(self.longitude, columns[7], np.float64),
+            neighborhoods=neighborhoods,
+            room_types=room_types,
+            watermark=max(filter(None, [self.watermark, *columns[8]])),
+        )
+
+    def search(self, order_by='price', offset=0, limit=None, **filters):
+        """
+        Return the ids of matching listings in the requested order.
+
+        Only the ``offset``/``limit`` slice is converted to Python ints; see
+        ``_mask()`` for the filters.
+        """
+        if order_by not in SORT_ORDERS:
+            raise ValueError(f"Unsupported sort order: {order_by}")
+
+        selected = np.flatnonzero(self._mask(**filters))
+        ids = self.ids[selected]
+        if order_by == 'price':
+            selected = selected[np.lexsort((ids, self.price[selected]))]
+        elif order_by == '-price':
+            selected = selected[np.lexsort((ids, -self.price[selected]))]
+        elif order_by == '-rating':
+            # NaN sorts last, matching NULLs in a descending SQL sort
+            selected = selected[np.lexsort((ids, -self.rating[selected]))]
+
+        end = None if limit is None else offset + limit
+        return self.ids[selected[offset:end]].tolist()
+
+    def count(self, **filters):
+        """Number of listings matching the search filters."""
+        return int(np.count_nonzero(self._mask(**filters)))
+
+    def _mask(self, neighborhood=None, room_type=None, min_price=None, max_price=None,
+              min_accommodates=None, min_rating=None, bbox=None):
+        """
+        Boolean mask of the rows matching the filters.
+
+        ``bbox`` is a (south, west, north, east) tuple of coordinates. Listings
+        without a rating or coordinates never match the corresponding filter,
+        like NULL comparisons in SQL.
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if neighborhood is not None:
+            mask &= self.neighborhood_codes == _code(self.neighborhoods, neighborhood)
+        if room_type is not None:
+            mask &= self.room_type_codes == _code(self.room_types, room_type)
+        if min_price is not None:
+            mask &= self.price >= float(min_price)
+        if max_price is not None:
+            mask &= self.price <= float(max_price)
+        if min_accommodates is not None:
+            mask &= self.accommodates >= min_accommodates
+        if min_rating is not None:
+            mask &= self.rating >= float(min_rating)
+        if bbox is not None:
+            south, west, north, east = (float(value) for value in bbox)
+            mask &= (self.latitude >= south) & (self.latitude <= north)
+            mask &= (self.longitude >= west) & (self.longitude <= east)
+        return mask
+
+
+class SearchResults:
+    """
+    Lazy sequence of a catalog search's ids, for paginators.
+
+    ``len()`` counts the filter mask and slicing searches only the requested
+    page, so no more than one page of ids becomes a Python list.
+    """
+
+    def __init__(self, catalog, order_by='price', **filters):
+        if order_by not in SORT_ORDERS:
+            raise ValueError(f"Unsupported sort order: {order_by}")
+        self.catalog = catalog
+        self.order_by = order_by
+        self.filters = filters
+
+    def __len__(self):
+        return self.catalog.count(**self.filters)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('SearchResults only supports contiguous slices')
+        start, stop, _ = index.indices(len(self.catalog.ids))
+        return self.catalog.search(
+            self.order_by, offset=start, limit=max(stop - start, 0), **self.filters
+        )
+
+
+def _intern(vocabulary, values):
+    """Extend the vocabulary with unseen values and return it with the codes for ``values``."""
+    index = {value: code for code, value in enumerate(vocabulary)}
+    vocabulary = list(vocabulary)
+    codes = []
+    for value in values:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(vocabulary)
+            vocabulary.append(value)
+        codes.append(code)
+    return tuple(vocabulary), codes
+
+
+def _code(vocabulary, value):
+    """Code of ``value`` in the vocabulary, or -1 so that it matches nothing."""
+    try:
+        return vocabulary.index(value)
+    except ValueError:
+        return -1
+
+
+_catalog = None
+_refresh_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Return the current process-wide snapshot, refreshing it when it is stale.
+
+    Only one thread refreshes at a time; the others keep reading the previous
+    snapshot until the new one is swapped in.
+    """
+    catalog = _catalog
+    max_age = getattr(settings, 'LISTING_CATALOG_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+    if catalog is not None and time.monotonic() - catalog.built_at < max_age:
+        return catalog
+    if not _refresh_lock.acquire(blocking=catalog is None):
+        return catalog
+    try:
+        # Another thread may have built the first snapshot while we waited
+        if catalog is None and _catalog is not None:
+            return _catalog
+        return refresh_catalog()
+    finally:
+        _refresh_lock.release()
+
+
+def refresh_catalog():
+    """Bring the snapshot up to date and swap it in."""
+    global _catalog
+    _catalog = _catalog.refreshed() if _catalog is not None else ListingCatalog.build()
+    return _catalog
@@ -0,0 +1,188 @@
+"""
+Write coalescing for counter-style updates to Listing.
+
+Every review, booking or view used to update its listing's row right away,
+so concurrent writers to a popular listing queued on that row's lock. The
+counter buffer instead accumulates per-listing deltas in process memory and
+a background thread flushes them every LISTING_COUNTERS_FLUSH_INTERVAL
+seconds (sooner once LISTING_COUNTERS_MAX_PENDING listings are pending):
+
+* booking and view counts are applied as one ``UPDATE ... SET n = n + delta``
+  per listing;
+* rating changes only mark the listing, and the flush recomputes its review
+  count and average once, however many reviews landed in between.
+
+Deltas are recorded on transaction commit, so rolled-back writes never
+count. Deltas still in memory when a process dies are lost; the counters
+are derived data, and ``reconcile_listing_counters()`` recomputes them
+from the source rows.
+"""
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest
+
+from .flushing import BackgroundFlusher, ProcessSingleton
+from .ingestion import refresh_listing_ratings
+from .models import ArchivedBooking, Booking, Listing, ListingImpressionCount
+
+
+COUNTER_FIELDS = ['number_of_bookings', 'number_of_views']
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 1000
+
+
+def counters_buffered():
+    """Whether listing counter updates go through the buffer (LISTING_COUNTERS_BUFFERED)."""
+    return getattr(settings, 'LISTING_COUNTERS_BUFFERED', True)
+
+
+class CounterBuffer(BackgroundFlusher):
+    """
+    In-process buffer of pending per-listing counter deltas.
+    """
+    thread_name = 'listing-counter-flusher'
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        super().__init__(flush_interval)
+        self.max_pending = max_pending
+        self._deltas = defaultdict(Counter)
+        self._ratings = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, listing_id, **deltas):
+        """Buffer counter deltas, e.g. ``add(pk, number_of_views=1)``, once the transaction commits."""
+        unknown = set(deltas) - set(COUNTER_FIELDS)
+        if unknown:
+            raise ValueError(f"Not a listing counter: {', '.join(sorted(unknown))}")
+        transaction.on_commit(lambda: self._record(listing_id, deltas))
+
+    def mark_ratings(self, listing_id):
+        """Schedule a review count and average rating recompute for the listing."""
+        transaction.on_commit(lambda: self._record(listing_id, ratings=True))
+
+    def pending(self):
+        """Number of listings with unflushed changes."""
+        with self._lock:
+            return len(self._deltas.keys() | self._ratings)
+
+    def _record(self, listing_id, deltas=None, ratings=False):
+        with self._lock:
+            if deltas:
+                self._deltas[listing_id].update(deltas)
+            if ratings:
+                self._ratings.add(listing_id)
+            pending = len(self._deltas.keys() | self._ratings)
+        self.ensure_flusher()
+        if pending >= self.max_pending:
+            self.wake()
+
+    def flush(self):
+        """Write all pending changes; returns the number of listings updated."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, defaultdict(Counter)
+                ratings, self._ratings = self._ratings, set()
+            if not deltas and not ratings:
+                return 0
+            try:
+                # Fixed lock order across concurrent flushers avoids deadlocks
+                with transaction.atomic(using=router.db_for_write(Listing)):
+                    for listing_id in sorted(deltas):
+                        changes = {
+                            field: _incremented(field, delta)
+                            for field, delta in deltas[listing_id].items() if delta
+                        }
+                        if changes:
+                            Listing.objects.filter(pk=listing_id).update(**changes)
+                    if ratings:
+                        refresh_listing_ratings(sorted(ratings))
+            except Exception:
+                # Put the changes back so that the next flush retries them
+                with self._lock:
+                    for listing_id, counts in deltas.items():
+                        self._deltas[listing_id].update(counts)
+                    self._ratings |= ratings
+                raise
+            return len(deltas.keys() | ratings)
+
+
+# Flushed at exit after the impression buffer, whose flushes add view counts here
+_buffer = ProcessSingleton(lambda: CounterBuffer(
+    flush_interval=getattr(settings, 'LISTING_COUNTERS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+    max_pending=getattr(settings, 'LISTING_COUNTERS_MAX_PENDING', DEFAULT_MAX_PENDING),
+), exit_stage=1)
+
+
+def get_counter_buffer():
+    """Return the process-wide counter buffer, creating it on first use."""
+    return _buffer.get()
+
+
+def increment_counter(listing_id, field, delta=1):
+    """Add ``delta`` to a listing counter, buffered or immediately depending on settings."""
+    if counters_buffered():
+        get_counter_buffer().add(listing_id, **{field: delta})
+    else:
+        Listing.objects.filter(pk=listing_id).update(**{field: _incremented(field, delta)})
+
+
+def _incremented(field, delta):
+    # Counters are unsigned; never let a decrement take them below zero
+    return Greatest(F(field) + delta, Value(0))
+
+
+def reconcile_listing_counters(listing_ids=None, batch_size=500):
+    """
+    Recompute booking and view counts and ratings from the source rows.
+
+    Covers the given listings, or every listing when ``listing_ids`` is None.
+    Booking counts include archived bookings; view counts are the sum of the
+    hourly impression counts. This process's pending impressions and deltas
+    are flushed first; deltas still buffered by other processes may be counted
+    twice until the next run. Returns the number of listings reconciled.
+    """
+    from .impressions import flush_impressions
+    flush_impressions()
+    _buffer.flush()
+    if listing_ids is None:
+        listing_ids = Listing.objects.order_by('pk').values_list('pk', flat=True)
+    listing_ids = list(listing_ids)
+
+    for start in range(0, len(listing_ids), batch_size):
+        batch = listing_ids[start:start + batch_size]
+        bookings = Counter()
+        for model in (Booking, ArchivedBooking):
+            bookings.update(dict(
+                model.objects.filter(listing_id__in=batch)
+                .values('listing_id')
+                .annotate(count=Count('id'))
+                .order_by()
+                .values_list('listing_id', 'count')
+            ))
+        views = dict(
+            ListingImpressionCount.objects.filter(listing_id__in=batch)
+            .values('listing_id')
+            .annotate(total=Sum('views'))
+            .order_by()
+            .values_list('listing_id', 'total')
+        )
+        with transaction.atomic():
+            Listing.objects.bulk_update(
+                [
+                    Listing(
+                        pk=listing_id,
+                        number_of_bookings=bookings[listing_id],
+                        number_of_views=views.get(listing_id, 0),
+                    )
+                    for listing_id in batch
+                ],
+                ['number_of_bookings', 'number_of_views'],
+            )
+            refresh_listing_ratings(batch)
+    return len(listing_ids)
@@ -0,0 +1,104 @@
+"""
+Background flushing shared by the in-process write buffers.
+
+The counter and impression buffers collect writes in memory and drain them
+from a daemon thread. ``BackgroundFlusher`` runs that thread: it is started
+on first use and started again in a forked worker, where threads do not
+survive. ``ProcessSingleton`` holds the one buffer of each kind per process.
+
+A single exit hook flushes the buffers in ascending ``exit_stage``: a buffer
+that writes into another (impressions add view counts to the counter
+buffer) must flush in an earlier stage, or its last writes would land in a
+buffer that has already flushed for the last time. ``atexit`` alone runs
+hooks newest first, which depends on the order the buffers were created.
+"""
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundFlusher:
+    """
+    Base class for buffers whose ``flush()`` runs every ``flush_interval`` seconds.
+    """
+    thread_name = 'buffer-flusher'
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def flush(self):
+        raise NotImplementedError
+
+    def ensure_flusher(self):
+        """Start the flusher thread unless it is already running in this process."""
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name=self.thread_name, daemon=True
+                    )
+                    self._thread.start()
+
+    def wake(self):
+        """Flush now instead of at the end of the current interval."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('%s failed; will retry', self.thread_name)
+            finally:
+                close_old_connections()
+
+
+class ProcessSingleton:
+    """
+    Process-wide buffer built by ``factory`` on first use and flushed at exit.
+    """
+
+    def __init__(self, factory, exit_stage=0):
+        self.factory = factory
+        self.exit_stage = exit_stage
+        self.instance = None
+        self._lock = threading.Lock()
+        _singletons.append(self)
+
+    def get(self):
+        if self.instance is None:
+            with self._lock:
+                if self.instance is None:
+                    self.instance = self.factory()
+        return self.instance
+
+    def flush(self):
+        """Flush the buffer if this process created one; returns what flush() returned, else 0."""
+        return self.instance.flush() if self.instance is not None else 0
+
+
+_singletons = []
+
+
+def flush_all():
+    """Flush every buffer created in this process, stage by stage."""
+    for singleton in sorted(_singletons, key=lambda singleton: singleton.exit_stage):
+        if singleton.instance is None:
+            continue
+        try:
+            singleton.instance.flush()
+        except Exception:
+            logger.exception('%s failed at exit', singleton.instance.thread_name)
+
+
+atexit.register(flush_all)
@@ -0,0 +1,111 @@
+"""
+Booking history lookups keyed by guest email.
+
+A guest's bookings are paged newest check-in first with keyset pagination:
+the cursor carries the (check_in, id) of the last row served and the next
+page continues strictly after it. Equality on the stored (lowercased) email
+plus the (check_in, id) order is exactly the prefix of the
+(guest_email, check_in, id) index, so every page is a bounded index range
+scan with no filesort and no OFFSET, however deep the guest pages.
+
+Finished bookings moved to ArchivedBooking stay in the history: once the hot
+rows of a page run out, or reach back to the newest archived check-in, the
+same cursor continues into the archive's identical index and the two are
+merged. Archived rows get their listing titles in one extra lookup, since
+the archive may live in another database.
+"""
+import base64
+import binascii
+from datetime import date
+
+from django.db.models import Q
+
+from .archive import archive_horizon
+from .models import ArchivedBooking, Booking, Listing, normalize_guest_email
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+HISTORY_FIELDS = [
+    'id',
+    'listing_id',
+    'listing__title',
+    'check_in',
+    'check_out',
+    'guests',
+    'total_price',
+    'status',
+    'created_at',
+]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(check_in, booking_id):
+    """Opaque cursor for the position just after the given row."""
+    raw = f'{check_in.isoformat()}|{booking_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); returns (check_in, id)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        check_in, booking_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return date.fromisoformat(check_in), int(booking_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor('Invalid cursor.') from exc
+
+
+def _history_rows(model, email, position, limit, fields):
+    queryset = model.objects.filter(guest_email=email)
+    if position:
+        check_in, booking_id = position
+        queryset = queryset.filter(
+            Q(check_in__lt=check_in) | Q(check_in=check_in, id__lt=booking_id)
+        )
+    return list(queryset.order_by('-check_in', '-id').values(*fields)[:limit])
+
+
+def guest_booking_history(email, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of a guest's bookings and the cursor of the next page.
+
+    Rows are dicts of HISTORY_FIELDS, with the listing title fetched through
+    a single join for hot rows. The returned cursor is None on the last page.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    email = normalize_guest_email(email)
+    position = decode_cursor(cursor) if cursor else None
+
+    # Fetch one extra row to learn whether another page follows
+    rows = _history_rows(Booking, email, position, page_size + 1, HISTORY_FIELDS)
+    for row in rows:
+        row['listing_title'] = row.pop('listing__title')
+
+    if len(rows) <= page_size or rows[-1]['check_in'] <= (archive_horizon() or date.min):
+        archived = _history_rows(
+            ArchivedBooking, email, position, page_size + 1,
+            [name for name in HISTORY_FIELDS if name != 'listing__title'],
+        )
+        if archived:
+            titles = dict(
+                Listing.objects.filter(pk__in={row['listing_id'] for row in archived})
+                .values_list('id', 'title')
+            )
+            # A booking is briefly in both tables while its archive batch is moved
+            seen = {row['id'] for row in rows}
+            for row in archived:
+                if row['id'] not in seen:
+                    row['listing_title'] = titles.get(row['listing_id'])
+                    rows.append(row)
+            rows.sort(key=lambda row: (row['check_in'], row['id']), reverse=True)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]['check_in'], rows[-1]['id'])
+    return rows, next_cursor
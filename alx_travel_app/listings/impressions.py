@@ -0,0 +1,224 @@
+"""
+Listing view and search impression tracking.
+
+Read endpoints call ``record_view()`` / ``record_impressions()``, which only
+append an event to a bounded in-process ring buffer: a deque whose appends
+and pops are atomic under the GIL, so the request path never takes a lock
+or touches the database. When the buffer is full the oldest event is
+overwritten and counted as dropped.
+
+A background thread drains the buffer every IMPRESSIONS_FLUSH_INTERVAL
+seconds, aggregates the events per listing and hour, and adds them to
+ListingImpressionCount with one multi-row upsert per chunk. View totals are
+also added to Listing.number_of_views through the counter buffer. If the
+upsert fails, the aggregated counts are kept for the next flush, up to one
+buffer's worth of events; beyond that they are counted as dropped. Events
+for listings deleted before the flush are dropped rather than retried, since
+their rows could never be written.
+"""
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .counters import increment_counter
+from .flushing import BackgroundFlusher, ProcessSingleton
+from .models import Listing, ListingImpressionCount
+
+
+DEFAULT_BUFFER_SIZE = 100000
+DEFAULT_FLUSH_INTERVAL = 5.0
+UPSERT_CHUNK_SIZE = 500
+
+VIEW = 'views'
+IMPRESSION = 'impressions'
+
+
+class ImpressionBuffer(BackgroundFlusher):
+    """
+    Bounded ring buffer of (listing_id, hour, kind) events with drop accounting.
+    """
+    thread_name = 'impression-flusher'
+
+    def __init__(self, capacity=DEFAULT_BUFFER_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+        self.capacity = capacity
+        self._events = deque(maxlen=capacity)
+        # Aggregated counts of a failed flush, written by the next one
+        self._unflushed = Counter()
+        # Plain integer updates may lose a count under contention; they are
+        # monitoring figures, not billing data
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self._flush_lock = threading.Lock()
+
+    def record(self, listing_id, kind):
+        if len(self._events) >= self.capacity:
+            self.dropped += 1
+        self._events.append((listing_id, int(time.time() // 3600), kind))
+        self.recorded += 1
+        self.ensure_flusher()
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'buffered': len(self._events) + sum(self._unflushed.values()),
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'flushed': self.flushed,
+        }
+
+    def drain(self):
+        """Remove every buffered event and return them aggregated per (listing, hour)."""
+        counts = Counter()
+        while True:
+            try:
+                listing_id, hour, kind = self._events.popleft()
+            except IndexError:
+                break
+            counts[(listing_id, hour, kind)] += 1
+        return counts
+
+    def flush(self):
+        """Write buffered events to the hourly counters; returns the number of events written."""
+        with self._flush_lock:
+            counts = self.drain()
+            counts.update(self._unflushed)
+            self._unflushed = Counter()
+            if not counts:
+                return 0
+            try:
+                existing = set(
+                    Listing.objects.filter(pk__in={key[0] for key in counts})
+                    .values_list('pk', flat=True)
+                )
+                deleted = [key for key in counts if key[0] not in existing]
+                for key in deleted:
+                    self.dropped += counts.pop(key)
+                if not counts:
+                    return 0
+                rows = {}
+                for (listing_id, hour, kind), count in counts.items():
+                    row = rows.setdefault((listing_id, hour), {VIEW: 0, IMPRESSION: 0})
+                    row[kind] += count
+                _upsert_hourly_counts(rows)
+            except IntegrityError:
+                # A listing deleted since the check above; the same rows would fail again
+                self.dropped += sum(counts.values())
+                raise
+            except Exception:
+                # The upsert is one transaction, so none of these counts were written
+                if sum(counts.values()) <= self.capacity:
+                    self._unflushed = counts
+                else:
+                    self.dropped += sum(counts.values())
+                raise
+
+            views = Counter()
+            for (listing_id, _), row in rows.items():
+                views[listing_id] += row[VIEW]
+            for listing_id, count in views.items():
+                if count:
+                    increment_counter(listing_id, 'number_of_views', count)
+
+            written = sum(counts.values())
+            self.flushed += written
+            return written
+
+
+def _upsert_hourly_counts(rows):
+    """Add {(listing_id, hour): {'views': n, 'impressions': m}} to ListingImpressionCount."""
+    db = router.db_for_write(ListingImpressionCount)
+    connection = connections[db]
+    table = connection.ops.quote_name(ListingImpressionCount._meta.db_table)
+    if connection.vendor == 'mysql':
+        conflict = (
+            'ON DUPLICATE KEY UPDATE views = views + VALUES(views), '
+            'impressions = impressions + VALUES(impressions)'
+        )
+    else:
+        conflict = (
+            f'ON CONFLICT (listing_id, hour) DO UPDATE SET '
+            f'views = {table}.views + excluded.views, '
+            f'impressions = {table}.impressions + excluded.impressions'
+        )
+
+    items = sorted(rows.items())
+    with transaction.atomic(using=db), connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_CHUNK_SIZE):
+            chunk = items[start:start + UPSERT_CHUNK_SIZE]
+            params = []
+            for (listing_id, hour), row in chunk:
+                params += [listing_id, _hour_start(hour, connection), row[VIEW], row[IMPRESSION]]
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(chunk))
+            cursor.execute(
+                f'INSERT INTO {table} (listing_id, hour, views, impressions) '
+                f'VALUES {placeholders} {conflict}',
+                params,
+            )
+
+
+def _hour_start(hour, connection):
+    """Database value for the start of an hour given as hours since the epoch."""
+    value = datetime.fromtimestamp(hour * 3600, tz=dt_timezone.utc)
+    return ListingImpressionCount._meta.get_field('hour').get_db_prep_value(value, connection)
+
+
+_buffer = ProcessSingleton(lambda: ImpressionBuffer(
+    capacity=getattr(settings, 'IMPRESSIONS_BUFFER_SIZE', DEFAULT_BUFFER_SIZE),
+    flush_interval=getattr(settings, 'IMPRESSIONS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+))
+
+
+def get_impression_buffer():
+    """Return the process-wide impression buffer, creating it on first use."""
+    return _buffer.get()
+
+
+def flush_impressions():
+    """Write this process's buffered events now, if any were recorded."""
+    return _buffer.flush()
+
+
+def record_view(listing_id):
+    """Count one detail view of a listing."""
+    get_impression_buffer().record(listing_id, VIEW)
+
+
+def record_impressions(listing_ids):
+    """Count one search impression for each listing shown in a result page."""
+    buffer = get_impression_buffer()
+    for listing_id in listing_ids:
+        buffer.record(listing_id, IMPRESSION)
+
+
+def hourly_counts(listing_id, since=None, until=None):
+    """
+    Hourly view and impression counts for a listing, oldest hour first.
+
+    Defaults to the last 24 hours. Events still in a buffer are not included.
+    """
+    until = until or timezone.now()
+    since = since or until - timedelta(hours=24)
+    return list(
+        ListingImpressionCount.objects.filter(
+            listing_id=listing_id, hour__gte=since, hour__lt=until
+        ).order_by('hour').values('hour', 'views', 'impressions')
+    )
+
+
+def total_counts(listing_id, since=None, until=None):
+    """Summed views and impressions for a listing over [since, until)."""
+    queryset = ListingImpressionCount.objects.filter(listing_id=listing_id)
+    if since is not None:
+        queryset = queryset.filter(hour__gte=since)
+    if until is not None:
+        queryset = queryset.filter(hour__lt=until)
+    totals = queryset.aggregate(views=Sum('views'), impressions=Sum('impressions'))
+    return {name: value or 0 for name, value in totals.items()}
@@ -0,0 +1,240 @@
+"""
+Bulk ingestion of reviews imported from partner platforms.
+
+Records are consumed as a stream and written in batches. Each batch is
+deduplicated on the (listing, reviewer_id) key, upserted with a single
+bulk_create(), and the rating aggregates of the listings it touched are
+recomputed once per batch instead of once per review as Review.save() does.
+Records without a reviewer_id have no key; they are deduplicated on their
+content (listing, reviewer name, comments and rating) and only inserted
+when no identical anonymous review exists. Re-running an interrupted
+import is therefore safe.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from .models import Listing, Review
+from .rankings import mark_listings_dirty
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+DETAIL_RATING_FIELDS = [
+    'accuracy_rating',
+    'cleanliness_rating',
+    'checkin_rating',
+    'communication_rating',
+    'location_rating',
+    'value_rating',
+]
+
+# Fields overwritten when an incoming review matches a stored one
+UPSERT_FIELDS = ['reviewer_name', 'comments', 'rating', *DETAIL_RATING_FIELDS, 'updated_at']
+
+
+@dataclass
+class IngestStats:
+    """Counters collected over one ingestion run."""
+    received: int = 0
+    created: int = 0
+    updated: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    batches: int = 0
+    listing_refreshes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self):
+        """Records processed per second."""
+        return self.received / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def duplicate_rate(self):
+        """Share of received records whose key had already been seen or stored."""
+        return self.duplicates / self.received if self.received else 0.0
+
+
+def read_records(stream, fmt='jsonl'):
+    """
+    Lazily yield raw review records from a text stream.
+
+    Supported formats are JSON Lines ('jsonl') and CSV with a header row ('csv').
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported review format: {fmt}")
+
+
+def ingest_reviews(records, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Upsert an iterable of review records and return an IngestStats.
+
+    Each record is a mapping with at least listing_id, reviewer_name,
+    comments and rating; reviewer_id and the detailed ratings are optional.
+    Records that fail validation or reference an unknown listing are counted
+    as rejected and skipped.
+    """
+    stats = IngestStats()
+    started = time.perf_counter()
+    batch = []
+    for record in records:
+        stats.received += 1
+        review = _build_review(record)
+        if review is None:
+            stats.rejected += 1
+            continue
+        batch.append(review)
+        if len(batch) >= batch_size:
+            _write_batch(batch, stats)
+            batch = []
+    if batch:
+        _write_batch(batch, stats)
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def refresh_listing_ratings(listing_ids):
+    """Recompute review count and average rating for the given listings in one pass."""
+    aggregates = {
+        row['listing_id']: row
+        for row in Review.objects.filter(listing_id__in=listing_ids)
+        .values('listing_id')
+        .annotate(count=Count('id'), avg=Avg('rating'))
+        .order_by()
+    }
+    now = timezone.now()
+    listings = []
+    for listing_id in listing_ids:
+        row = aggregates.get(listing_id)
+        listings.append(Listing(
+            pk=listing_id,
+            number_of_reviews=row['count'] if row else 0,
+            review_scores_rating=round(row['avg'], 2) if row else None,
+            updated_at=now,
+        ))
+    Listing.objects.bulk_update(
+        listings, ['number_of_reviews', 'review_scores_rating', 'updated_at']
+    )
+    mark_listings_dirty(listing_ids)
+
+
+def _build_review(record):
+    """Turn a raw record into an unsaved Review, or None if it is invalid."""
+    try:
+        listing_id = int(record['listing_id'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    values = {
+        'reviewer_name': record.get('reviewer_name') or '',
+        'reviewer_id': str(record.get('reviewer_id') or '').strip() or None,
+        'comments': record.get('comments') or '',
+        'rating': record.get('rating'),
+    }
+    for field in DETAIL_RATING_FIELDS:
+        # CSV exports carry missing detail ratings as empty strings
+        value = record.get(field)
+        values[field] = None if value == '' else value
+
+    review = Review(listing_id=listing_id, **values)
+    try:
+        review.clean_fields(exclude=['listing'])
+    except ValidationError:
+        return None
+    return review
+
+
+def _upsert_target():
+    """Conflict target for the upsert; MySQL infers it from the unique key."""
+    if connection.features.supports_update_conflicts_with_target:
+        return ['listing', 'reviewer_id']
+    return None
+
+
+def _write_batch(reviews, stats):
+    """Deduplicate, upsert and refresh the listing aggregates for one batch."""
+    listing_ids = {review.listing_id for review in reviews}
+    known_listings = set(
+        Listing.objects.filter(pk__in=listing_ids).values_list('pk', flat=True)
+    )
+
+    # Deduplicate within the batch; the last occurrence of a key wins
+    keyed = {}
+    anonymous = {}
+    for review in reviews:
+        if review.listing_id not in known_listings:
+            stats.rejected += 1
+        elif review.reviewer_id is None:
+            key = _content_key(review)
+            if key in anonymous:
+                stats.duplicates += 1
+            else:
+                anonymous[key] = review
+        else:
+            key = (review.listing_id, review.reviewer_id)
+            if key in keyed:
+                stats.duplicates += 1
+            keyed[key] = review
+
+    stored_keys = set(
+        Review.objects.filter(
+            listing_id__in={key[0] for key in keyed},
+            reviewer_id__in={key[1] for key in keyed},
+        ).values_list('listing_id', 'reviewer_id')
+    ) & keyed.keys()
+    stored_anonymous = _stored_content_keys(anonymous.values()) & anonymous.keys()
+    anonymous = [review for key, review in anonymous.items() if key not in stored_anonymous]
+
+    touched = {review.listing_id for review in anonymous} | {key[0] for key in keyed}
+    with transaction.atomic():
+        if keyed:
+            Review.objects.bulk_create(
+                list(keyed.values()),
+                update_conflicts=True,
+                unique_fields=_upsert_target(),
+                update_fields=UPSERT_FIELDS,
+            )
+        if anonymous:
+            Review.objects.bulk_create(anonymous)
+        if touched:
+            refresh_listing_ratings(touched)
+
+    stats.batches += 1
+    stats.duplicates += len(stored_keys) + len(stored_anonymous)
+    stats.updated += len(stored_keys)
+    stats.created += len(keyed) - len(stored_keys) + len(anonymous)
+    stats.listing_refreshes += len(touched)
+
+
+def _content_key(review):
+    """Identity of an anonymous review, which has no reviewer_id to key on."""
+    return (review.listing_id, review.reviewer_name, review.comments, int(review.rating))
+
+
+def _stored_content_keys(reviews):
+    """Content keys of stored anonymous reviews that may match the given ones."""
+    reviews = list(reviews)
+    if not reviews:
+        return set()
+    return {
+        (listing_id, name, comments, rating)
+        for listing_id, name, comments, rating in Review.objects.filter(
+            listing_id__in={review.listing_id for review in reviews},
+            reviewer_name__in={review.reviewer_name for review in reviews},
+            reviewer_id__isnull=True,
+        ).values_list('listing_id', 'reviewer_name', 'comments', 'rating')
+    }
@@ -0,0 +1,76 @@
+"""
+Booking status lifecycle transitions.
+
+Confirmed bookings whose check-out has passed become 'completed' and pending
+bookings older than the pending TTL become 'cancelled'. Both transitions run
+as set-based UPDATEs over bounded primary-key batches selected through the
+status index, so no row goes through save()/full_clean(). Each UPDATE
+re-checks the source status, which makes the job idempotent and safe to run
+concurrently with regular edits. Moving a booking out of
+Booking.ACTIVE_STATUSES releases the dates it held.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PENDING_TTL_HOURS = 24
+
+
+def complete_finished_bookings(today=None, batch_size=None):
+    """Mark confirmed bookings whose check-out date has passed as completed."""
+    today = today or timezone.localdate()
+    queryset = Booking.objects.filter(status='confirmed', check_out__lt=today)
+    return _transition(queryset, 'confirmed', 'completed', batch_size)
+
+
+def expire_stale_pending(now=None, ttl=None, batch_size=None):
+    """Cancel pending bookings created more than ``ttl`` ago."""
+    now = now or timezone.now()
+    if ttl is None:
+        ttl = timedelta(hours=getattr(
+            settings, 'BOOKING_PENDING_TTL_HOURS', DEFAULT_PENDING_TTL_HOURS
+        ))
+    queryset = Booking.objects.filter(status='pending', created_at__lt=now - ttl)
+    return _transition(queryset, 'pending', 'cancelled', batch_size)
+
+
+def run_booking_lifecycle(batch_size=None):
+    """Run every lifecycle transition and return the number of rows moved by each."""
+    counts = {
+        'confirmed->completed': complete_finished_bookings(batch_size=batch_size),
+        'pending->cancelled': expire_stale_pending(batch_size=batch_size),
+    }
+    for transition, count in counts.items():
+        logger.info('Booking lifecycle %s: %d bookings', transition, count)
+    return counts
+
+
+def _transition(queryset, from_status, to_status, batch_size=None):
+    """Move matching bookings from one status to another in bounded batches."""
+    batch_size = batch_size or getattr(
+        settings, 'BOOKING_LIFECYCLE_BATCH_SIZE', DEFAULT_BATCH_SIZE
+    )
+    total = 0
+    while True:
+        # Materialize the batch first: MySQL rejects LIMIT inside an IN subquery
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            moved = Booking.objects.filter(pk__in=ids, status=from_status).update(
+                status=to_status,
+                updated_at=timezone.now(),
+            )
+        total += moved
+        if len(ids) < batch_size:
+            break
+    return total
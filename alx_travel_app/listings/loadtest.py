@@ -0,0 +1,491 @@
+"""
+Load testing against the local app with a replayable mixed workload.
+
+``WorkloadGenerator`` turns the seeded listings into a reproducible stream
+of API requests, mixing operations in configurable ratios:
+
+* ``search``: GET /api/listings/ with random filters and ordering;
+* ``detail``: GET /api/listings/<id>/;
+* ``availability``: GET /api/listings/<id>/availability/;
+* ``create_booking``: POST /api/bookings/;
+* ``post_review``: POST /api/reviews/.
+
+``run_load()`` replays the stream open-loop at a target rate from an
+asyncio event loop through one of three transports: the ASGI application
+called in-process, the WSGI application called from a thread pool, or a
+running server over HTTP. Latency is measured from each request's scheduled
+send time, so a saturated app shows up as queueing delay instead of a lower
+request rate. Results hold p50/p95/p99 latency, throughput and error rates
+per operation and serialize to JSON for comparing runs.
+"""
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.views import APIView
+
+from .catalog import SORT_ORDERS
+from .counters import reconcile_listing_counters
+from .models import Booking, Listing, Review
+from .throttling import CONCURRENCY_SCOPE, rejection_counts
+
+
+OPERATIONS = ['search', 'detail', 'availability', 'create_booking', 'post_review']
+DEFAULT_MIX = {
+    'search': 40,
+    'detail': 30,
+    'availability': 15,
+    'create_booking': 10,
+    'post_review': 5,
+}
+# Operations served only when settings.LOAD_TEST_ENDPOINTS is on
+WRITE_OPERATIONS = ['create_booking', 'post_review']
+PERCENTILES = [50, 95, 99]
+HOST = 'localhost'
+
+# Marks the bookings and reviews created by load tests
+EMAIL_DOMAIN = 'loadtest.example.com'
+REVIEWER_PREFIX = 'LOAD-'
+
+
+def parse_mix(value):
+    """Parse 'search=40,detail=30,...' into operation weights; unlisted operations get 0."""
+    mix = dict.fromkeys(OPERATIONS, 0)
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in mix:
+            raise ValueError(f"Unknown operation: {name} (choose from {', '.join(OPERATIONS)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f'Invalid weight for {name}: {weight!r}')
+        if mix[name] < 0:
+            raise ValueError(f'Weight for {name} must not be negative')
+    if not any(mix.values()):
+        raise ValueError('At least one operation needs a positive weight')
+    return mix
+
+
+@dataclass
+class LoadRequest:
+    operation: str
+    method: str
+    path: str
+    body: dict = None
+
+
+class WorkloadGenerator:
+    """
+    Reproducible stream of API requests over the listings in the database.
+    """
+
+    def __init__(self, mix=None, seed=0):
+        self.mix = mix or DEFAULT_MIX
+        self.random = random.Random(seed)
+        self.run_id = f'{seed}-{int(time.time())}'
+        self.sequence = 0
+        # Loaded once up front: requests are built inside the event loop,
+        # where the ORM may not be called
+        listings = list(Listing.objects.order_by('pk').values_list(
+            'pk', 'neighborhood', 'room_type', 'price', 'minimum_nights'
+        ))
+        if not listings:
+            raise ValueError('No listings to load test against; run the seed command first.')
+        self.listings = listings
+        self.neighborhoods = sorted({row[1] for row in listings})
+        self.room_types = sorted({row[2] for row in listings})
+        self.operations = [name for name in OPERATIONS if self.mix.get(name)]
+        self.weights = [self.mix[name] for name in self.operations]
+
+    def __iter__(self):
+        while True:
+            yield self.next_request()
+
+    def next_request(self):
+        self.sequence += 1
+        operation = self.random.choices(self.operations, self.weights)[0]
+        return getattr(self, f'_{operation}')()
+
+    def _search(self):
+        params = {'ordering': self.random.choice(SORT_ORDERS)}
+        if self.random.random() < 0.7:
+            params['neighborhood'] = self.random.choice(self.neighborhoods)
+        if self.random.random() < 0.4:
+            params['room_type'] = self.random.choice(self.room_types)
+        if self.random.random() < 0.3:
+            params['max_price'] = self.random.choice([100, 200, 300, 500])
+        return LoadRequest('search', 'GET', f'/api/listings/?{urlencode(params)}')
+
+    def _detail(self):
+        listing_id = self.random.choice(self.listings)[0]
+        return LoadRequest('detail', 'GET', f'/api/listings/{listing_id}/')
+
+    def _availability(self):
+        listing_id, _, _, _, minimum_nights = self.random.choice(self.listings)
+        check_in, check_out = self._stay(minimum_nights)
+        query = urlencode({'check_in': check_in.isoformat(), 'check_out': check_out.isoformat()})
+        return LoadRequest('availability', 'GET', f'/api/listings/{listing_id}/availability/?{query}')
+
+    def _create_booking(self):
+        listing_id, _, _, price, minimum_nights = self.random.choice(self.listings)
+        check_in, check_out = self._stay(minimum_nights)
+        return LoadRequest('create_booking', 'POST', '/api/bookings/', {
+            'listing': listing_id,
+            'listing_id': listing_id,
+            'guest_name': 'Load Test',
+            'guest_email': f'load.{self.run_id}.{self.sequence}@{EMAIL_DOMAIN}',
+            'check_in': check_in.isoformat(),
+            'check_out': check_out.isoformat(),
+            'guests': 1,
+            'price_per_night': str(price),
+            'total_price': str(price),
+        })
+
+    def _post_review(self):
+        listing_id = self.random.choice(self.listings)[0]
+        return LoadRequest('post_review', 'POST', '/api/reviews/', {
+            'listing': listing_id,
+            'reviewer_name': 'Load Test',
+            'reviewer_id': f'{REVIEWER_PREFIX}{self.run_id}-{self.sequence}',
+            'comments': 'Review posted by the load test.',
+            'rating': self.random.randint(1, 5),
+        })
+
+    def _stay(self, minimum_nights):
+        # Spread stays over two years so that most bookings don't collide
+        check_in = timezone.localdate() + timedelta(days=self.random.randint(30, 760))
+        nights = max(minimum_nights, self.random.randint(1, 7))
+        return check_in, check_in + timedelta(days=nights)
+
+
+def delete_load_test_data():
+    """
+    Delete the bookings and reviews created by load tests and repair the listings' counters.
+
+    Returns (bookings deleted, reviews deleted).
+    """
+    bookings = Booking.objects.filter(guest_email__endswith=f'@{EMAIL_DOMAIN}')
+    reviews = Review.objects.filter(reviewer_id__startswith=REVIEWER_PREFIX)
+    listing_ids = set(bookings.values_list('listing_id', flat=True))
+    listing_ids |= set(reviews.values_list('listing_id', flat=True))
+    deleted_bookings, _ = bookings.delete()
+    deleted_reviews, _ = reviews.delete()
+    if listing_ids:
+        reconcile_listing_counters(sorted(listing_ids))
+    return deleted_bookings, deleted_reviews
+
+
+@contextmanager
+def throttling_disabled():
+    """
+    Lift the API throttles of views in this process while the block runs.
+
+    DRF copies DEFAULT_THROTTLE_CLASSES onto APIView when it is imported, so
+    overriding the setting later has no effect; the class attribute, which
+    every view without its own ``throttle_classes`` inherits, is patched instead.
+    """
+    original = APIView.__dict__['throttle_classes']
+    APIView.throttle_classes = []
+    try:
+        yield
+    finally:
+        APIView.throttle_classes = original
+
+
+def throttled_views(resolver=None):
+    """Names of the routed API views that apply at least one throttle."""
+    names = set()
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            names |= throttled_views(pattern)
+            continue
+        view_class = getattr(pattern.callback, 'cls', None)
+        if view_class is not None and view_class().get_throttles():
+            names.add(view_class.__name__)
+    return names
+
+
+def throttle_rejections():
+    """Requests rejected by rate limits in this process, leaving out concurrency shedding."""
+    return sum(count for scope, count in rejection_counts().items() if scope != CONCURRENCY_SCOPE)
+
+
+def _encode_body(request):
+    return json.dumps(request.body).encode() if request.body is not None else b''
+
+
+def _split_path(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+class AsgiTransport:
+    """
+    Calls the ASGI application in-process.
+    """
+    name = 'asgi'
+
+    def __init__(self, application):
+        self.application = application
+
+    async def send(self, request):
+        path, query = _split_path(request.path)
+        body = _encode_body(request)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': request.method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', HOST.encode()),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': (HOST, 80),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        status = None
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Nothing more to read: wait like a client that keeps the connection open
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await self.application(scope, receive, send)
+        return status
+
+    async def close(self):
+        pass
+
+
+class WsgiTransport:
+    """
+    Calls the WSGI application from a pool of worker threads.
+    """
+    name = 'wsgi'
+
+    def __init__(self, application, workers=16):
+        self.application = application
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='loadtest-wsgi')
+
+    async def send(self, request):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, request)
+
+    def _call(self, request):
+        path, query = _split_path(request.path)
+        body = _encode_body(request)
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': HOST,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(' ', 1)[0]))
+
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return status[0]
+
+    async def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class HttpTransport:
+    """
+    Sends HTTP/1.1 requests to a running server, one connection per request.
+    """
+    name = 'http'
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        if url.scheme != 'http' or not url.hostname:
+            raise ValueError(f'Expected an http:// base URL, got {base_url!r}')
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+
+    async def send(self, request):
+        body = _encode_body(request)
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = (
+                f'{request.method} {self.prefix}{request.path} HTTP/1.1\r\n'
+                f'Host: {self.host}:{self.port}\r\n'
+                'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                'Connection: close\r\n\r\n'
+            )
+            writer.write(head.encode() + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            # Read the rest so that the server-side timing covers the full response
+            await reader.read()
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    async def close(self):
+        pass
+
+
+@dataclass
+class OperationStats:
+    requests: int = 0
+    errors: int = 0
+    latencies: list = field(default_factory=list)
+    statuses: dict = field(default_factory=dict)
+
+    def record(self, latency, status):
+        self.requests += 1
+        self.latencies.append(latency)
+        key = str(status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.requests, 4) if self.requests else 0.0,
+            'throughput': round(self.requests / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': {
+                f'p{q}': round(_percentile(latencies, q) * 1000, 2) for q in PERCENTILES
+            },
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def run_load(transport, requests, rps, duration, max_in_flight=256):
+    """
+    Send ``requests`` at ``rps`` per second for ``duration`` seconds.
+
+    Requests are started on schedule whatever the response times, up to
+    ``max_in_flight`` outstanding ones; a request that cannot start on time
+    still has its latency counted from its scheduled time. Failed requests
+    are recorded with the exception class name as status. Returns the
+    result dict (see ``OperationStats.summary()``).
+    """
+    stats = {name: OperationStats() for name in OPERATIONS}
+    slots = asyncio.Semaphore(max_in_flight)
+    loop = asyncio.get_running_loop()
+    total = int(rps * duration)
+    tasks = []
+
+    async def fire(request, scheduled):
+        try:
+            status = await transport.send(request)
+        except Exception as exc:
+            status = type(exc).__name__
+        finally:
+            slots.release()
+        stats[request.operation].record(loop.time() - scheduled, status)
+
+    started = loop.time()
+    for number, request in zip(range(total), requests):
+        scheduled = started + number / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        tasks.append(asyncio.create_task(fire(request, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+    await transport.close()
+
+    overall = OperationStats()
+    for operation_stats in stats.values():
+        overall.requests += operation_stats.requests
+        overall.errors += operation_stats.errors
+        overall.latencies += operation_stats.latencies
+        for status, count in operation_stats.statuses.items():
+            overall.statuses[status] = overall.statuses.get(status, 0) + count
+    return {
+        'elapsed': round(elapsed, 3),
+        'overall': overall.summary(elapsed),
+        'operations': {
+            name: operation_stats.summary(elapsed)
+            for name, operation_stats in stats.items() if operation_stats.requests
+        },
+    }
+
+
+def compare_results(baseline, current):
+    """
+    Per-operation changes between two saved results.
+
+    Returns {operation: {'throughput': delta, 'error_rate': delta, 'p99_ms': delta, ...}}
+    for operations present in both runs, including 'overall'.
+    """
+    def sections(result):
+        return {'overall': result['overall'], **result['operations']}
+
+    before, after = sections(baseline), sections(current)
+    changes = {}
+    for name in after:
+        if name not in before:
+            continue
+        old, new = before[name], after[name]
+        changes[name] = {
+            'throughput': round(new['throughput'] - old['throughput'], 2),
+            'error_rate': round(new['error_rate'] - old['error_rate'], 4),
+            **{
+                f'{key}_ms': round(new['latency_ms'][key] - old['latency_ms'][key], 2)
+                for key in new['latency_ms']
+            },
+        }
+    return changes
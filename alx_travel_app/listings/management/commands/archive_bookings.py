@@ -0,0 +1,34 @@
+"""
+Management command to move finished bookings out of the hot Booking table.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.archive import DEFAULT_BATCH_SIZE, archive_bookings, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Archive completed and cancelled bookings with a check-in older than N months'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.BOOKING_ARCHIVE_MONTHS,
+            help=f'Months of bookings kept in the hot table (default: {settings.BOOKING_ARCHIVE_MONTHS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of bookings moved per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['months'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--months must be non-negative and --batch-size at least 1.')
+
+        cutoff = archive_cutoff(options['months'])
+        self.stdout.write(f'Archiving finished bookings with check-in before {cutoff}...')
+        moved = archive_bookings(options['months'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} bookings.'))
@@ -0,0 +1,117 @@
+"""
+Management command to benchmark catalog snapshot searches against the ORM.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from listings.catalog import ListingCatalog
+from listings.models import Listing
+
+
+ORM_ORDERINGS = {
+    'price': ['price', 'id'],
+    '-price': ['-price', 'id'],
+    '-rating': [F('review_scores_rating').desc(nulls_last=True), 'id'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare listing searches served from the catalog snapshot with equivalent ORM queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Number of random searches to run (default: 200)',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Listings returned per search (default: 20)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the generated searches (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        if not Listing.objects.exists():
+            raise CommandError('No listings found; run the seed command first.')
+
+        started = time.perf_counter()
+        catalog = ListingCatalog.build()
+        build_time = time.perf_counter() - started
+        self.stdout.write(f'Built snapshot of {len(catalog)} listings in {build_time * 1000:.1f} ms')
+
+        rng = random.Random(options['seed'])
+        page_size = options['page_size']
+        timings = {'orm': [], 'catalog': [], 'catalog + hydrate': []}
+        mismatches = 0
+        for _ in range(options['queries']):
+            filters = self.random_filters(rng, catalog)
+            order_by = rng.choice(list(ORM_ORDERINGS))
+
+            started = time.perf_counter()
+            queryset = self.orm_queryset(filters).order_by(*ORM_ORDERINGS[order_by])
+            orm_page = list(queryset[:page_size])
+            timings['orm'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            ids = catalog.search(order_by=order_by, limit=page_size, **filters)
+            timings['catalog'].append(time.perf_counter() - started)
+            by_id = Listing.objects.in_bulk(ids)
+            [by_id[pk] for pk in ids]
+            timings['catalog + hydrate'].append(time.perf_counter() - started)
+
+            if ids != [listing.pk for listing in orm_page]:
+                mismatches += 1
+
+        for name, samples in timings.items():
+            samples = sorted(samples)
+            p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+            self.stdout.write(
+                f'  {name:<18} mean {statistics.mean(samples) * 1000:8.3f} ms   '
+                f'p50 {statistics.median(samples) * 1000:8.3f} ms   p95 {p95 * 1000:8.3f} ms'
+            )
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} searches returned different results'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All searches matched the ORM results.'))
+
+    def random_filters(self, rng, catalog):
+        """Pick a random combination of search filters."""
+        filters = {}
+        if catalog.neighborhoods and rng.random() < 0.6:
+            filters['neighborhood'] = rng.choice(catalog.neighborhoods)
+        if catalog.room_types and rng.random() < 0.5:
+            filters['room_type'] = rng.choice(catalog.room_types)
+        if rng.random() < 0.5:
+            filters['min_price'] = rng.randrange(0, 300, 25)
+            filters['max_price'] = filters['min_price'] + rng.randrange(50, 400, 25)
+        if rng.random() < 0.3:
+            filters['min_accommodates'] = rng.randint(1, 4)
+        if rng.random() < 0.3:
+            filters['min_rating'] = rng.choice([3, 4, 4.5])
+        return filters
+
+    def orm_queryset(self, filters):
+        """ORM equivalent of ListingCatalog.search() for the given filters."""
+        lookups = {
+            'neighborhood': 'neighborhood',
+            'room_type': 'room_type',
+            'min_price': 'price__gte',
+            'max_price': 'price__lte',
+            'min_accommodates': 'accommodates__gte',
+            'min_rating': 'review_scores_rating__gte',
+        }
+        return Listing.objects.filter(
+            **{lookups[name]: value for name, value in filters.items()}
+        )
@@ -0,0 +1,113 @@
+"""
+Management command to measure listing row contention with and without counter write coalescing.
+"""
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from listings.counters import get_counter_buffer
+from listings.models import Listing, Review
+
+
+BENCHMARK_HOST_ID = 'BENCH-COUNTERS'
+
+
+class Command(BaseCommand):
+    help = 'Post concurrent reviews to one hot listing with direct and buffered rating updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=8,
+            help='Number of concurrent writer threads (default: 8)',
+        )
+        parser.add_argument(
+            '--writes',
+            type=int,
+            default=50,
+            help='Reviews posted by each writer (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        Listing.objects.filter(host_id=BENCHMARK_HOST_ID).delete()
+        listing = Listing.objects.create(
+            title='Counter benchmark',
+            description='Synthetic hot listing for the counter benchmark.',
+            host_name='Benchmark',
+            host_id=BENCHMARK_HOST_ID,
+            neighborhood='Benchmark',
+            room_type='entire_home',
+            price=Decimal('100.00'),
+        )
+        try:
+            for mode, buffered in (('direct', False), ('buffered', True)):
+                with override_settings(LISTING_COUNTERS_BUFFERED=buffered):
+                    self.run_mode(mode, listing, options['writers'], options['writes'])
+            listing.refresh_from_db()
+            self.stdout.write(
+                f'Final listing state: {listing.number_of_reviews} reviews, '
+                f'rating {listing.review_scores_rating}'
+            )
+        finally:
+            listing.delete()
+
+    def run_mode(self, mode, listing, writers, writes):
+        latencies = []
+        errors = []
+        lock_before = self.row_lock_status()
+
+        def writer(number):
+            try:
+                for i in range(writes):
+                    started = time.perf_counter()
+                    with transaction.atomic():
+                        Review.objects.create(
+                            listing=listing,
+                            reviewer_name='Benchmark',
+                            reviewer_id=f'BENCH-{mode}-{number}-{i}',
+                            comments='Benchmark review',
+                            rating=(number + i) % 5 + 1,
+                        )
+                    latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if mode == 'buffered':
+            get_counter_buffer().flush()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)] if latencies else 0.0
+        self.stdout.write(
+            f'{mode:<9} {len(latencies) / elapsed:8.1f} writes/s   '
+            f'p50 {statistics.median(latencies or [0]) * 1000:8.2f} ms   p99 {p99 * 1000:8.2f} ms   '
+            f'errors {len(errors)}'
+        )
+        lock_after = self.row_lock_status()
+        if lock_before and lock_after:
+            self.stdout.write(
+                f'          row lock waits {lock_after["Innodb_row_lock_waits"] - lock_before["Innodb_row_lock_waits"]}, '
+                f'row lock time {lock_after["Innodb_row_lock_time"] - lock_before["Innodb_row_lock_time"]} ms'
+            )
+
+    def row_lock_status(self):
+        """InnoDB row lock counters, when running on MySQL."""
+        if connection.vendor != 'mysql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%%'")
+            return {name: int(value) for name, value in cursor.fetchall()}
@@ -0,0 +1,159 @@
+"""
+Management command to benchmark guest booking history lookups on a large table.
+"""
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from listings.guest_history import HISTORY_FIELDS, guest_booking_history
+from listings.models import Booking, Listing
+
+
+BENCHMARK_HOST_ID = 'BENCH-GUEST-HISTORY'
+FREQUENT_GUEST = 'frequent.guest@bench.example.com'
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Benchmark keyset-paginated guest history against OFFSET pagination on synthetic bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bookings',
+            type=int,
+            default=10_000_000,
+            help='Number of synthetic bookings to generate (default: 10000000)',
+        )
+        parser.add_argument(
+            '--bookings-per-guest',
+            type=int,
+            default=20,
+            help='Average bookings per synthetic guest (default: 20)',
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=200,
+            help='Number of random first-page lookups to time (default: 200)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the synthetic bookings instead of deleting them afterwards',
+        )
+
+    def handle(self, *args, **options):
+        if Listing.objects.filter(host_id=BENCHMARK_HOST_ID).exists():
+            raise CommandError(
+                f'Benchmark data from a previous --keep run exists (host_id {BENCHMARK_HOST_ID}); '
+                'delete that listing first.'
+            )
+        listing = Listing.objects.create(
+            title='Guest history benchmark',
+            description='Synthetic listing owning benchmark bookings.',
+            host_name='Benchmark',
+            host_id=BENCHMARK_HOST_ID,
+            neighborhood='Benchmark',
+            room_type='entire_home',
+            price=Decimal('100.00'),
+        )
+        try:
+            guests = max(1, options['bookings'] // options['bookings_per_guest'])
+            self.generate(listing, options['bookings'], guests)
+            self.run_lookups(guests, options['lookups'])
+            self.run_deep_pages()
+            self.explain()
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing synthetic bookings...')
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {Booking._meta.db_table} WHERE listing_id = %s', [listing.pk]
+                    )
+                Listing.objects.filter(pk=listing.pk).delete()
+
+    def generate(self, listing, count, guests, batch_size=10000):
+        """Bulk-insert synthetic bookings; 1% belong to a single frequent guest."""
+        rng = random.Random(0)
+        start = date(2015, 1, 1)
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            batch = []
+            for _ in range(min(batch_size, count - offset)):
+                if rng.random() < 0.01:
+                    email = FREQUENT_GUEST
+                else:
+                    email = f'guest{rng.randrange(guests)}@bench.example.com'
+                check_in = start + timedelta(days=rng.randrange(3650))
+                batch.append(Booking(
+                    listing=listing,
+                    guest_name='Benchmark Guest',
+                    guest_email=email,
+                    check_in=check_in,
+                    check_out=check_in + timedelta(days=rng.randint(1, 14)),
+                    price_per_night=Decimal('100.00'),
+                    total_price=Decimal('100.00'),
+                    status='completed',
+                ))
+            Booking.objects.bulk_create(batch)
+            if (offset // batch_size + 1) % 100 == 0:
+                self.stdout.write(f'  Inserted {offset + len(batch)}/{count} bookings...')
+        self.stdout.write(f'Generated {count} bookings for {guests} guests '
+                          f'in {time.perf_counter() - started:.1f}s')
+
+    def run_lookups(self, guests, lookups):
+        """Time first-page lookups for random guests."""
+        rng = random.Random(1)
+        samples = []
+        for _ in range(lookups):
+            email = f'Guest{rng.randrange(guests)}@Bench.Example.com'
+            started = time.perf_counter()
+            guest_booking_history(email, page_size=PAGE_SIZE)
+            samples.append(time.perf_counter() - started)
+        self.report('first page (random guest)', samples)
+
+    def run_deep_pages(self):
+        """Compare keyset and OFFSET pagination at increasing depths for the frequent guest."""
+        cursors = {}
+        cursor, page = None, 1
+        while page <= 1000:
+            if page in (1, 10, 100, 1000):
+                cursors[page] = cursor
+            _, cursor = guest_booking_history(FREQUENT_GUEST, cursor, PAGE_SIZE)
+            if cursor is None:
+                break
+            page += 1
+
+        queryset = Booking.objects.filter(guest_email=FREQUENT_GUEST).order_by('-check_in', '-id')
+        for page, cursor in cursors.items():
+            keyset, offset = [], []
+            for _ in range(20):
+                started = time.perf_counter()
+                guest_booking_history(FREQUENT_GUEST, cursor, PAGE_SIZE)
+                keyset.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                start = (page - 1) * PAGE_SIZE
+                list(queryset.values(*HISTORY_FIELDS)[start:start + PAGE_SIZE])
+                offset.append(time.perf_counter() - started)
+            self.report(f'page {page} keyset', keyset)
+            self.report(f'page {page} offset', offset)
+
+    def explain(self):
+        """Print the plan of a keyset page query."""
+        queryset = Booking.objects.filter(guest_email=FREQUENT_GUEST).order_by('-check_in', '-id')
+        self.stdout.write('Plan for the history query:')
+        self.stdout.write(queryset.values(*HISTORY_FIELDS)[:PAGE_SIZE + 1].explain())
+
+    def report(self, name, samples):
+        samples = sorted(samples)
+        p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+        self.stdout.write(
+            f'  {name:<28} p50 {statistics.median(samples) * 1000:8.3f} ms   '
+            f'p95 {p95 * 1000:8.3f} ms'
+        )
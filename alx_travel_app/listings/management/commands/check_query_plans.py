@@ -0,0 +1,83 @@
+"""
+Management command to check that the ORM hot paths use their indexes.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.query_plans import HOT_PATHS, check_hot_paths, unused_indexes
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the SQL of each ORM hot path, fail on full scans or filesorts, and report unused indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Hot paths to check (default: all of ' + ', '.join(path.name for path in HOT_PATHS) + ')',
+        )
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Print the SQL and plan of every captured query',
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the results and the unused index report to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = check_hot_paths(options['paths'] or None)
+        except (ValueError, NotImplementedError) as exc:
+            raise CommandError(str(exc))
+
+        for result in results:
+            status = self.style.SUCCESS('ok') if result.ok else self.style.ERROR('FAIL')
+            self.stdout.write(f'{result.path.name:<28} {status}')
+            for problem in result.problems:
+                self.stdout.write(f'    {problem}')
+            if options['show_plans']:
+                for alias, sql, plan in result.queries:
+                    self.stdout.write(f'    [{alias}] {sql}')
+                    for step in plan:
+                        self.stdout.write(f'        {step.detail}')
+
+        unused = unused_indexes(results)
+        self.stdout.write('\nIndexes not used by any checked hot path:')
+        for entry in unused:
+            notes = []
+            if entry['unique']:
+                notes.append('unique')
+            if entry['covered_by']:
+                notes.append('covered by ' + ', '.join(entry['covered_by']))
+            self.stdout.write(
+                f"    {entry['table']}.{entry['index']} ({', '.join(entry['columns'])})"
+                + (f"  [{'; '.join(notes)}]" if notes else '')
+            )
+        if not unused:
+            self.stdout.write('    none')
+
+        if options['report']:
+            with open(options['report'], 'w') as report:
+                json.dump({
+                    'paths': [
+                        {
+                            'name': result.path.name,
+                            'ok': result.ok,
+                            'problems': result.problems,
+                            'queries': [
+                                {'database': alias, 'sql': sql, 'plan': [step.detail for step in plan]}
+                                for alias, sql, plan in result.queries
+                            ],
+                        }
+                        for result in results
+                    ],
+                    'unused_indexes': unused,
+                }, report, indent=2)
+
+        failed = [result.path.name for result in results if not result.ok]
+        if failed:
+            raise CommandError(f"Query plan regressions in: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} hot paths use their indexes.'))
@@ -0,0 +1,61 @@
+"""
+Management command to bulk-ingest partner reviews from a JSON Lines or CSV file.
+"""
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.ingestion import DEFAULT_BATCH_SIZE, ingest_reviews, read_records
+
+
+class Command(BaseCommand):
+    help = 'Bulk-ingest reviews with (listing, reviewer_id) deduplication and batched rating updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to read reviews from, or "-" for standard input',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['jsonl', 'csv'],
+            help='Input format (default: inferred from the file extension, jsonl for stdin)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of reviews written per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            fmt = 'csv' if Path(path).suffix.lower() == '.csv' else 'jsonl'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        try:
+            if path == '-':
+                stats = ingest_reviews(read_records(sys.stdin, fmt), options['batch_size'])
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    stats = ingest_reviews(read_records(stream, fmt), options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+        except ValueError as exc:
+            raise CommandError(f'Malformed input in {path}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ingested {stats.received} records in {stats.elapsed:.2f}s '
+            f'({stats.throughput:.0f} records/s, {stats.batches} batches)'
+        ))
+        self.stdout.write(
+            f'  Created: {stats.created}, updated: {stats.updated}, rejected: {stats.rejected}'
+        )
+        self.stdout.write(
+            f'  Duplicates: {stats.duplicates} ({stats.duplicate_rate:.1%}), '
+            f'listing rating refreshes: {stats.listing_refreshes}'
+        )
@@ -0,0 +1,190 @@
+"""
+Management command to load test the API with a mixed workload over the seeded listings.
+"""
+import asyncio
+import json
+from contextlib import nullcontext
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.loadtest import (
+    DEFAULT_MIX, WRITE_OPERATIONS, AsgiTransport, HttpTransport, WorkloadGenerator, WsgiTransport,
+    compare_results, delete_load_test_data, parse_mix, run_load, throttle_rejections,
+    throttled_views, throttling_disabled,
+)
+
+
+class Command(BaseCommand):
+    help = 'Replay a mix of searches, detail reads, availability checks, bookings and reviews at a target rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--transport',
+            choices=['asgi', 'wsgi', 'http'],
+            default='asgi',
+            help='Call the ASGI or WSGI app in-process, or a running server over HTTP (default: asgi)',
+        )
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Base URL for --transport http (default: http://127.0.0.1:8000)',
+        )
+        parser.add_argument(
+            '--rps',
+            type=float,
+            default=50,
+            help='Target requests per second (default: 50)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Seconds to send requests for (default: 30)',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help='Operation weights (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the workload (default: 0)',
+        )
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=256,
+            help='Most requests outstanding at once (default: 256)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Threads calling the app for --transport wsgi (default: 16)',
+        )
+        parser.add_argument(
+            '--throttle',
+            action='store_true',
+            help='Keep API rate limits for in-process runs, which lift them by default so that '
+                 'fast 429s do not skew latency',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the bookings and reviews created by the run instead of deleting them afterwards',
+        )
+        parser.add_argument(
+            '--output',
+            help='JSON file for the results (default: loadtest-<timestamp>.json)',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Earlier results JSON file to compare this run against',
+        )
+
+    def handle(self, *args, **options):
+        if options['rps'] <= 0 or options['duration'] <= 0:
+            raise CommandError('--rps and --duration must be positive.')
+        try:
+            mix = parse_mix(options['mix'])
+            workload = WorkloadGenerator(mix, seed=options['seed'])
+            transport = self.get_transport(options)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        writes = [name for name in WRITE_OPERATIONS if mix[name]]
+        if writes and transport.name != 'http' and not settings.LOAD_TEST_ENDPOINTS:
+            raise CommandError(
+                f"{', '.join(writes)} need LOAD_TEST_ENDPOINTS=1, or leave them out of --mix."
+            )
+
+        self.stdout.write(
+            f"Sending {int(options['rps'] * options['duration'])} requests at {options['rps']:g}/s "
+            f"through {transport.name} over {len(workload.listings)} listings..."
+        )
+        started_at = datetime.now().isoformat(timespec='seconds')
+        # A server over HTTP keeps its own rate limits
+        unthrottled = not options['throttle'] and transport.name != 'http'
+        rejections_before = throttle_rejections()
+        try:
+            with throttling_disabled() if unthrottled else nullcontext():
+                still_throttled = throttled_views() if unthrottled else set()
+                if still_throttled:
+                    raise CommandError('Throttles still apply to: ' + ', '.join(sorted(still_throttled)))
+                results = asyncio.run(run_load(
+                    transport, workload, options['rps'], options['duration'], options['max_in_flight'],
+                ))
+        finally:
+            # Replaying the same seed books the same dates, so leftovers would collide
+            if not options['keep']:
+                bookings, reviews = delete_load_test_data()
+                self.stdout.write(f'Deleted {bookings} load test bookings and {reviews} reviews.')
+
+        results = {
+            'started_at': started_at,
+            'config': {
+                'transport': transport.name,
+                'url': options['url'] if transport.name == 'http' else None,
+                'rps': options['rps'],
+                'duration': options['duration'],
+                'mix': mix,
+                'seed': options['seed'],
+                'max_in_flight': options['max_in_flight'],
+                'throttled': not unthrottled,
+            },
+            # 429s from the in-process app; a server over HTTP keeps its own counts
+            'throttle_rejections': (
+                throttle_rejections() - rejections_before if transport.name != 'http' else None
+            ),
+            **results,
+        }
+        self.report(results)
+        if unthrottled and results['throttle_rejections']:
+            self.stderr.write(self.style.ERROR('Rate limits were lifted, yet requests were throttled.'))
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.stdout.write('\nChange against ' + options['compare'] + ':')
+            for name, change in compare_results(baseline, results).items():
+                self.stdout.write(
+                    f"{name:<16} throughput {change['throughput']:+9.2f}/s   "
+                    f"p50 {change['p50_ms']:+9.2f} ms   p95 {change['p95_ms']:+9.2f} ms   "
+                    f"p99 {change['p99_ms']:+9.2f} ms   errors {change['error_rate']:+.2%}"
+                )
+
+        output = options['output'] or f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+    def get_transport(self, options):
+        if options['transport'] == 'http':
+            return HttpTransport(options['url'])
+        if options['transport'] == 'wsgi':
+            from alx_travel_app.wsgi import application
+            return WsgiTransport(application, workers=options['workers'])
+        from alx_travel_app.asgi import application
+        return AsgiTransport(application)
+
+    def report(self, results):
+        self.stdout.write(
+            f"\n{'operation':<16} {'requests':>8} {'req/s':>8} {'errors':>7} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses"
+        )
+        rows = {**results['operations'], 'overall': results['overall']}
+        for name, summary in rows.items():
+            latency = summary['latency_ms']
+            statuses = ', '.join(f'{status}: {count}' for status, count in summary['statuses'].items())
+            self.stdout.write(
+                f"{name:<16} {summary['requests']:>8} {summary['throughput']:>8.1f} "
+                f"{summary['error_rate']:>7.1%} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+                f"{latency['p99']:>9.2f}  {statuses}"
+            )
+        self.stdout.write(f"Elapsed {results['elapsed']:.1f} s")
+        if results['throttle_rejections'] is not None:
+            state = 'on' if results['config']['throttled'] else 'off'
+            self.stdout.write(f"Throttled {results['throttle_rejections']} requests (rate limits {state})")
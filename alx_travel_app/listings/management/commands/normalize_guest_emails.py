@@ -0,0 +1,46 @@
+"""
+Management command to lowercase guest emails stored before normalization was enforced.
+
+Every booking is read in primary key batches and compared in Python: a
+database-side ``guest_email <> LOWER(TRIM(guest_email))`` filter would treat
+mixed-case emails as already normalized under MySQL's case-insensitive
+collations.
+"""
+from django.core.management.base import BaseCommand
+
+from listings.models import Booking, normalize_guest_email
+
+
+class Command(BaseCommand):
+    help = 'Lowercase and trim guest emails on existing bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of bookings read per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        total = 0
+        while True:
+            batch = list(
+                Booking.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'guest_email')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            changed = [
+                Booking(pk=pk, guest_email=normalize_guest_email(email))
+                for pk, email in batch
+                if email != normalize_guest_email(email)
+            ]
+            if changed:
+                Booking.objects.bulk_update(changed, ['guest_email'])
+                total += len(changed)
+        self.stdout.write(self.style.SUCCESS(f'Normalized {total} guest emails.'))
@@ -0,0 +1,22 @@
+"""
+Management command to recompute listing counters from the source rows.
+"""
+from django.core.management.base import BaseCommand
+
+from listings.counters import reconcile_listing_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute listing booking and view counts and ratings, repairing counter deltas lost in crashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'listing_ids',
+            nargs='*',
+            type=int,
+            help='Listings to reconcile (default: all listings)',
+        )
+
+    def handle(self, *args, **options):
+        count = reconcile_listing_counters(options['listing_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters for {count} listings.'))
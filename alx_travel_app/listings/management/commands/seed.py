@@ -227,7 +227,7 @@ class Command(BaseCommand):
             review = Review.objects.create(
                 listing=listing,
                 reviewer_name=random.choice(reviewer_names),
-                reviewer_id=f'REV{random.randint(10000, 99999)}',
+                reviewer_id=f'REV{10000 + i}',
                 comments=random.choice(comments_templates),
                 rating=rating,
                 accuracy_rating=random.randint(1, 5) if random.random() > 0.3 else None,
@@ -0,0 +1,26 @@
+"""
+Management command to run the booking status lifecycle transitions.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.lifecycle import run_booking_lifecycle
+
+
+class Command(BaseCommand):
+    help = 'Complete finished bookings and expire stale pending bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of bookings updated per batch (default: BOOKING_LIFECYCLE_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        counts = run_booking_lifecycle(batch_size=options['batch_size'])
+        for transition, count in counts.items():
+            self.stdout.write(f'  {transition}: {count} bookings')
+        self.stdout.write(self.style.SUCCESS('Booking lifecycle run completed.'))
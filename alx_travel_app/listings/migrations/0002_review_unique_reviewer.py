@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:27
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def blank_reviewer_ids_to_null(apps, schema_editor):
+    # Anonymous reviews were stored with '' and would collide on the new unique key
+    Review = apps.get_model('listings', 'Review')
+    Review.objects.filter(reviewer_id='').update(reviewer_id=None)
+
+
+def null_reviewer_ids_to_blank(apps, schema_editor):
+    Review = apps.get_model('listings', 'Review')
+    Review.objects.filter(reviewer_id__isnull=True).update(reviewer_id='')
+
+
+def delete_duplicate_reviews(apps, schema_editor):
+    # Re-imports stored the same reviewer's review of a listing more than once;
+    # keep the newest of each and recompute the affected listings' ratings
+    Review = apps.get_model('listings', 'Review')
+    Listing = apps.get_model('listings', 'Listing')
+    duplicated = (
+        Review.objects.filter(reviewer_id__isnull=False)
+        .values('listing_id', 'reviewer_id')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    listing_ids = set()
+    for key in duplicated:
+        ids = list(
+            Review.objects.filter(listing_id=key['listing_id'], reviewer_id=key['reviewer_id'])
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+        Review.objects.filter(id__in=ids[1:]).delete()
+        listing_ids.add(key['listing_id'])
+
+    for listing_id in listing_ids:
+        totals = Review.objects.filter(listing_id=listing_id).aggregate(count=Count('id'), avg=Avg('rating'))
+        Listing.objects.filter(pk=listing_id).update(
+            number_of_reviews=totals['count'],
+            review_scores_rating=round(totals['avg'], 2) if totals['avg'] is not None else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='reviewer_id',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(blank_reviewer_ids_to_null, null_reviewer_ids_to_blank),
+        migrations.RunPython(delete_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('listing', 'reviewer_id'), name='unique_review_per_reviewer'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_review_unique_reviewer'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='listings_bo_guest_e_654941_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['guest_email', 'check_in', 'id'], name='listings_bo_guest_e_5c07ce_idx'),
+        ),
+    ]
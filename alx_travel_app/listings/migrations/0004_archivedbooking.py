@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_booking_guest_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('guest_name', models.CharField(max_length=100)),
+                ('guest_email', models.EmailField(max_length=254)),
+                ('guest_phone', models.CharField(blank=True, max_length=20)),
+                ('check_in', models.DateField()),
+                ('check_out', models.DateField()),
+                ('guests', models.PositiveIntegerField(default=1)),
+                ('price_per_night', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed')], max_length=20)),
+                ('special_requests', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('listing', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_bookings', to='listings.listing')),
+            ],
+            options={
+                'db_table': 'listings_booking_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['check_in'], name='listings_bo_check_i_29cc27_idx'), models.Index(fields=['listing', 'check_in', 'check_out'], name='listings_bo_listing_b333ce_idx'), models.Index(fields=['guest_email', 'check_in', 'id'], name='listings_bo_guest_e_d305cf_idx')],
+            },
+        ),
+    ]
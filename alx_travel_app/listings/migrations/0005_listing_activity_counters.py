@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_archivedbooking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='number_of_bookings',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='number_of_views',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
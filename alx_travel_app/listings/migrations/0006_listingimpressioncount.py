@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_listing_activity_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingImpressionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='impression_counts', to='listings.listing')),
+            ],
+            options={
+                'ordering': ['-hour'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='listingimpressioncount',
+            constraint=models.UniqueConstraint(fields=('listing', 'hour'), name='unique_impression_count_per_hour'),
+        ),
+    ]
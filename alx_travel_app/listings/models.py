@@ -47,6 +47,10 @@ class Listing(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(5)]
     )
     
+    # Activity counters (maintained through listings.counters)
+    number_of_bookings = models.PositiveIntegerField(default=0)
+    number_of_views = models.PositiveIntegerField(default=0)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -64,6 +68,29 @@ class Listing(models.Model):
         return f"{self.title} - {self.host_name}"
 
 
+def normalize_guest_email(email):
+    """Canonical form of a guest email as stored on bookings."""
+    return email.strip().lower()
+
+
+class BookingQuerySet(models.QuerySet):
+    """
+    QuerySet helpers for bookings that still hold a listing's dates.
+    """
+    
+    def active(self):
+        """Bookings that block their dates (pending or confirmed)."""
+        return self.filter(status__in=Booking.ACTIVE_STATUSES)
+    
+    def overlapping(self, listing, check_in, check_out):
+        """Active bookings for the listing whose stay intersects [check_in, check_out)."""
+        return self.active().filter(
+            listing=listing,
+            check_in__lt=check_out,
+            check_out__gt=check_in,
+        )
+
+
 class Booking(models.Model):
     """
     Model representing a booking/reservation for a listing.
@@ -74,6 +101,8 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
     ]
+    # Statuses that hold the listing's dates; moving out of them releases availability
+    ACTIVE_STATUSES = ['pending', 'confirmed']
     
     listing = models.ForeignKey(
         Listing, 
@@ -105,12 +134,15 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BookingQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['listing', 'check_in', 'check_out']),
             models.Index(fields=['status']),
-            models.Index(fields=['guest_email']),
+            # Guest history: equality on email, keyset order on (check_in, id)
+            models.Index(fields=['guest_email', 'check_in', 'id']),
         ]
     
     def __str__(self):
@@ -122,10 +154,85 @@ class Booking(models.Model):
             raise ValidationError("Check-out date must be after check-in date.")
     
     def save(self, *args, **kwargs):
+        # Emails are stored lowercased so that lookups never need LOWER()
+        if self.guest_email:
+            self.guest_email = normalize_guest_email(self.guest_email)
         self.full_clean()
         super().save(*args, **kwargs)
 
 
+class ArchivedBooking(models.Model):
+    """
+    Model representing a finished booking moved out of the hot Booking table.
+
+    Rows keep the id they had as a Booking. The archive may live in its own
+    database (see BookingArchiveRouter), so the listing reference carries no
+    database constraint and archived rows outlive deleted listings.
+    """
+    # Fields copied verbatim between Booking and ArchivedBooking
+    COPIED_FIELDS = [
+        'id', 'listing_id', 'guest_name', 'guest_email', 'guest_phone',
+        'check_in', 'check_out', 'guests', 'price_per_night', 'total_price',
+        'status', 'special_requests', 'created_at', 'updated_at',
+    ]
+    
+    id = models.BigIntegerField(primary_key=True)
+    listing = models.ForeignKey(
+        Listing,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_bookings'
+    )
+    
+    # Guest Information
+    guest_name = models.CharField(max_length=100)
+    guest_email = models.EmailField()
+    guest_phone = models.CharField(max_length=20, blank=True)
+    
+    # Booking Details
+    check_in = models.DateField()
+    check_out = models.DateField()
+    guests = models.PositiveIntegerField(default=1)
+    
+    # Pricing
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    # Status
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    
+    # Special Requests
+    special_requests = models.TextField(blank=True)
+    
+    # Timestamps (copied from the booking, not set on archival)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'listings_booking_archive'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['check_in']),
+            models.Index(fields=['listing', 'check_in', 'check_out']),
+            models.Index(fields=['guest_email', 'check_in', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Archived booking {self.id} ({self.check_in} to {self.check_out})"
+    
+    @classmethod
+    def from_booking(cls, booking):
+        """Build an unsaved archive row from a booking."""
+        return cls(**{field: getattr(booking, field) for field in cls.COPIED_FIELDS})
+    
+    def as_booking(self):
+        """Unsaved, read-only Booking view of this row, flagged with ``archived``."""
+        booking = Booking(**{field: getattr(self, field) for field in self.COPIED_FIELDS})
+        booking.archived = True
+        return booking
+
+
 class Review(models.Model):
     """
     Model representing a review/rating for a listing.
@@ -138,7 +245,8 @@ class Review(models.Model):
     
     # Reviewer Information
     reviewer_name = models.CharField(max_length=100)
-    reviewer_id = models.CharField(max_length=50, blank=True)
+    # Nullable so that anonymous reviews don't collide on the unique key below
+    reviewer_id = models.CharField(max_length=50, blank=True, null=True)
     
     # Review Content
     comments = models.TextField()
@@ -189,11 +297,19 @@ class Review(models.Model):
             models.Index(fields=['listing', 'rating']),
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['listing', 'reviewer_id'],
+                name='unique_review_per_reviewer',
+            ),
+        ]
     
     def __str__(self):
         return f"Review by {self.reviewer_name} for {self.listing.title} - {self.rating}/5"
     
     def save(self, *args, **kwargs):
+        if not self.reviewer_id:
+            self.reviewer_id = None
         super().save(*args, **kwargs)
         # Update listing's review count and average rating
         self.update_listing_ratings()
@@ -202,11 +318,20 @@ class Review(models.Model):
         listing = self.listing
         super().delete(*args, **kwargs)
         # Update listing's review count and average rating after deletion
-        self._update_listing_ratings(listing)
+        self._schedule_rating_update(listing)
     
     def update_listing_ratings(self):
         """Update the listing's review count and average rating."""
-        self._update_listing_ratings(self.listing)
+        self._schedule_rating_update(self.listing)
+    
+    @classmethod
+    def _schedule_rating_update(cls, listing):
+        """Recompute ratings now, or via the counter buffer when writes are coalesced."""
+        from .counters import counters_buffered, get_counter_buffer
+        if counters_buffered():
+            get_counter_buffer().mark_ratings(listing.pk)
+        else:
+            cls._update_listing_ratings(listing)
     
     @staticmethod
     def _update_listing_ratings(listing):
@@ -220,5 +345,35 @@ class Review(models.Model):
             listing.review_scores_rating = round(avg_rating, 2) if avg_rating else None
         else:
             listing.review_scores_rating = None
-        listing.save(update_fields=['number_of_reviews', 'review_scores_rating'])
+        # updated_at is included so that catalog snapshots pick up the new rating
+        listing.save(update_fields=['number_of_reviews', 'review_scores_rating', 'updated_at'])
 
+
+class ListingImpressionCount(models.Model):
+    """
+    Model representing hourly view and search impression counts for a listing.
+    """
+    listing = models.ForeignKey(
+        Listing, 
+        on_delete=models.CASCADE, 
+        related_name='impression_counts'
+    )
+    
+    # Start of the hour the counts cover
+    hour = models.DateTimeField()
+    
+    # Detail page views and appearances in search/ranking results
+    views = models.PositiveIntegerField(default=0)
+    impressions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['listing', 'hour'],
+                name='unique_impression_count_per_hour',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.listing_id} @ {self.hour}: {self.views} views, {self.impressions} impressions"
@@ -0,0 +1,359 @@
+"""
+Query-plan checks for the ORM hot paths.
+
+Each hot path runs the real code (inside a transaction that is rolled
+back) while every SELECT it sends is captured. The captured statements are
+then EXPLAINed on the connection that ran them, SQLite or MySQL, and the
+plans are checked for:
+
+* full table scans (including SQLite's automatic, per-query indexes);
+* filesorts / temporary B-trees, unless the path is allowed to sort;
+* the index the path is expected to use, matched by its leading columns.
+
+``unused_indexes()`` lists the indexes that no hot path used, which only
+add write cost unless they enforce uniqueness or serve queries not listed
+here. MySQL picks plans from table statistics, so run the checks against a
+seeded database; SQLite plans do not depend on the data.
+"""
+import re
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.db import connections, transaction
+
+from .archive import archive_horizon
+from .guest_history import encode_cursor, guest_booking_history
+from .impressions import hourly_counts
+from .ingestion import refresh_listing_ratings
+from .lifecycle import complete_finished_bookings, expire_stale_pending
+from .models import ArchivedBooking, Booking, Listing, ListingImpressionCount, Review
+from .rankings import top_rated, trending
+
+
+# Arguments for the hot paths; the plans do not depend on matching rows existing
+SAMPLE_LISTING_ID = 1
+SAMPLE_EMAIL = 'query.plan@example.com'
+SAMPLE_DAY = date(2024, 1, 1)
+EPOCH = datetime(1970, 1, 2, tzinfo=dt_timezone.utc)
+
+
+@dataclass
+class HotPath:
+    name: str
+    run: object
+    # {model: [field, ...]}: the index each table must be read through
+    expects: dict = field(default_factory=dict)
+    allow_sort: bool = False
+
+
+@dataclass
+class PlanStep:
+    table: str
+    index: str = None
+    columns: tuple = ()
+    full_scan: bool = False
+    sort: bool = False
+    # MIN()/MAX() answered from an index without reading rows (MySQL)
+    optimized_away: bool = False
+    detail: str = ''
+
+
+@dataclass
+class PlanResult:
+    path: HotPath
+    # [(database alias, sql, [PlanStep, ...]), ...]
+    queries: list = field(default_factory=list)
+    problems: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.problems
+
+
+HOT_PATHS = []
+
+
+def hot_path(name, expects=None, allow_sort=False):
+    """Register the decorated function as a named hot path."""
+    def register(run):
+        HOT_PATHS.append(HotPath(name, run, expects or {}, allow_sort))
+        return run
+    return register
+
+
+@hot_path('booking_overlap', expects={Booking: ['listing', 'check_in', 'check_out']})
+def _booking_overlap():
+    listing = Listing(pk=SAMPLE_LISTING_ID)
+    Booking.objects.overlapping(listing, SAMPLE_DAY, SAMPLE_DAY + timedelta(days=7)).exists()
+
+
+@hot_path('guest_history_first_page', expects={
+    Booking: ['guest_email', 'check_in', 'id'],
+    ArchivedBooking: ['guest_email', 'check_in', 'id'],
+})
+def _guest_history_first_page():
+    guest_booking_history(SAMPLE_EMAIL)
+
+
+@hot_path('guest_history_next_page', expects={
+    Booking: ['guest_email', 'check_in', 'id'],
+    ArchivedBooking: ['guest_email', 'check_in', 'id'],
+})
+def _guest_history_next_page():
+    guest_booking_history(SAMPLE_EMAIL, encode_cursor(SAMPLE_DAY, 1000))
+
+
+@hot_path('listing_by_host', expects={Listing: ['host_id']})
+def _listing_by_host():
+    Listing.objects.filter(host_id='query-plan-host').exists()
+
+
+# Marking rankings dirty de-duplicates the refreshed listings' groups with a small sort
+@hot_path('review_aggregates', expects={Review: ['listing', 'rating']}, allow_sort=True)
+def _review_aggregates():
+    refresh_listing_ratings([SAMPLE_LISTING_ID, SAMPLE_LISTING_ID + 1])
+
+
+@hot_path('complete_finished_bookings', expects={Booking: ['status']})
+def _complete_finished_bookings():
+    # A date before any check-out, so that no rows are moved
+    complete_finished_bookings(today=EPOCH.date())
+
+
+@hot_path('expire_stale_pending', expects={Booking: ['status']})
+def _expire_stale_pending():
+    expire_stale_pending(now=EPOCH, ttl=timedelta(0))
+
+
+@hot_path('archive_horizon', expects={ArchivedBooking: ['check_in']})
+def _archive_horizon():
+    archive_horizon()
+
+
+@hot_path('impression_hourly_counts', expects={ListingImpressionCount: ['listing', 'hour']})
+def _impression_hourly_counts():
+    hourly_counts(SAMPLE_LISTING_ID)
+
+
+# Rankings sort the scored rows of one group; the group lookup must still use an index
+@hot_path('ranking_top_rated', expects={Listing: ['neighborhood']}, allow_sort=True)
+def _ranking_top_rated():
+    top_rated('neighborhood', 'query-plan-neighborhood', global_mean=4.0)
+
+
+@hot_path('ranking_trending', expects={Listing: ['room_type']}, allow_sort=True)
+def _ranking_trending():
+    trending('room_type', 'entire_home')
+
+
+def capture_selects(run):
+    """
+    Call ``run()`` and return the SELECTs it sent as (alias, sql, params).
+
+    Every database is wrapped in a transaction that is rolled back, so
+    writes made along the way are discarded.
+    """
+    captured = []
+
+    def make_wrapper(alias):
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip()[:6].upper() == 'SELECT' and not many:
+                captured.append((alias, sql, params))
+            return execute(sql, params, many, context)
+        return wrapper
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(transaction.atomic(using=connection.alias))
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(make_wrapper(connection.alias)))
+        try:
+            run()
+        finally:
+            for connection in connections.all():
+                transaction.set_rollback(True, using=connection.alias)
+    return captured
+
+
+def explain(sql, params, using='default'):
+    """Return the plan of a SELECT as a list of PlanSteps."""
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        return _explain_sqlite(connection, sql, params)
+    if connection.vendor == 'mysql':
+        return _explain_mysql(connection, sql, params)
+    raise NotImplementedError(f'EXPLAIN is not supported for {connection.vendor}')
+
+
+_SQLITE_ACCESS = re.compile(
+    r'^(?P<kind>SCAN|SEARCH) (?:TABLE )?(?P<table>\S+)(?: AS \S+)?'
+    r'(?: USING (?P<automatic>AUTOMATIC )?(?:COVERING )?INDEX (?P<index>\S+)'
+    r'| USING (?:INTEGER )?PRIMARY KEY)?'
+)
+
+
+def _explain_sqlite(connection, sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        details = [row[-1] for row in cursor.fetchall()]
+        steps = []
+        for detail in details:
+            if detail.startswith('USE TEMP B-TREE'):
+                steps.append(PlanStep(table='', sort=True, detail=detail))
+                continue
+            match = _SQLITE_ACCESS.match(detail)
+            if not match or match['table'] == 'CONSTANT':
+                continue
+            index = match['index']
+            table, columns = match['table'], ()
+            if index and not match['automatic']:
+                cursor.execute(
+                    "SELECT tbl_name FROM sqlite_master WHERE type = 'index' AND name = %s",
+                    [index],
+                )
+                row = cursor.fetchone()
+                table = row[0] if row else table
+                cursor.execute(f'PRAGMA index_info({connection.ops.quote_name(index)})')
+                columns = tuple(name for _, _, name in sorted(cursor.fetchall()))
+            steps.append(PlanStep(
+                table=table,
+                index=index,
+                columns=columns,
+                # A full pass over a table or index, or an index built for this query
+                full_scan=match['kind'] == 'SCAN' or bool(match['automatic']),
+                detail=detail,
+            ))
+    return steps
+
+
+def _explain_mysql(connection, sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        names = [column[0].lower() for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+    indexes = _index_catalog(connection)
+    steps = []
+    for row in rows:
+        extra = row.get('extra') or ''
+        index = row.get('key')
+        table = row.get('table') or ''
+        columns = ()
+        if index:
+            # Tables may appear under a query alias; index names are unique enough
+            candidates = [key for key in indexes if key[1] == index]
+            exact = [key for key in candidates if key[0] == table]
+            if exact or len(candidates) == 1:
+                table, _ = (exact or candidates)[0]
+                columns = indexes[(table, index)]['columns']
+        steps.append(PlanStep(
+            table=table,
+            index=index,
+            columns=tuple(columns),
+            full_scan=row.get('type') in ('ALL', 'index'),
+            sort='Using filesort' in extra or 'Using temporary' in extra,
+            optimized_away='optimized away' in extra,
+            detail=' '.join(f'{name}={value}' for name, value in row.items() if value is not None),
+        ))
+    return steps
+
+
+def check_hot_paths(names=None):
+    """
+    Run and EXPLAIN the named hot paths (all when ``names`` is None).
+
+    Returns a PlanResult per path; ``problems`` lists every violation found.
+    """
+    paths = HOT_PATHS
+    if names:
+        unknown = set(names) - {path.name for path in HOT_PATHS}
+        if unknown:
+            raise ValueError(f"Unknown hot path: {', '.join(sorted(unknown))}")
+        paths = [path for path in HOT_PATHS if path.name in names]
+
+    results = []
+    for path in paths:
+        result = PlanResult(path)
+        for alias, sql, params in capture_selects(path.run):
+            result.queries.append((alias, sql, explain(sql, params, alias)))
+        steps = [step for _, _, plan in result.queries for step in plan]
+
+        for step in steps:
+            if step.full_scan:
+                result.problems.append(f'full scan: {step.detail}')
+            if step.sort and not path.allow_sort:
+                result.problems.append(f'sort without index: {step.detail}')
+        for model, fields in path.expects.items():
+            table = model._meta.db_table
+            expected = tuple(model._meta.get_field(name).column for name in fields)
+            used = [
+                step for step in steps
+                if step.table == table and step.columns[:len(expected)] == expected
+            ]
+            if not used and not any(step.optimized_away for step in steps):
+                result.problems.append(
+                    f"{table} not read through an index on ({', '.join(expected)})"
+                )
+        results.append(result)
+    return results
+
+
+def _index_catalog(connection):
+    """{(table, index name): constraint info} for every index on the listings tables."""
+    catalog = {}
+    tables = [model._meta.db_table for model in apps.get_app_config('listings').get_models()]
+    existing = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        for table in tables:
+            if table not in existing:
+                continue
+            constraints = connection.introspection.get_constraints(cursor, table)
+            for name, info in constraints.items():
+                if (info['index'] or info['unique']) and not info['primary_key']:
+                    catalog[(table, name)] = info
+    return catalog
+
+
+def unused_indexes(results, using='default'):
+    """
+    Indexes on the listings tables that none of the checked hot paths used.
+
+    Each entry is a dict with ``table``, ``index``, ``columns``, ``unique``
+    and ``covered_by``: other indexes on the same table whose leading
+    columns match this one's, making it redundant for reads.
+    """
+    catalog = _index_catalog(connections[using])
+    used = set()
+    for result in results:
+        for alias, _, plan in result.queries:
+            if alias != using:
+                continue
+            for step in plan:
+                if (step.table, step.index) in catalog:
+                    used.add((step.table, step.index))
+                elif step.columns:
+                    # SQLite names the indexes of unique columns differently in plans
+                    used.update(
+                        key for key, info in catalog.items()
+                        if key[0] == step.table and info['unique']
+                        and tuple(info['columns']) == step.columns
+                    )
+    report = []
+    for (table, name), info in sorted(catalog.items()):
+        if (table, name) in used:
+            continue
+        columns = tuple(info['columns'])
+        covered_by = sorted(
+            other for (other_table, other), other_info in catalog.items()
+            if other_table == table and other != name
+            and tuple(other_info['columns'][:len(columns)]) == columns
+        )
+        report.append({
+            'table': table,
+            'index': name,
+            'columns': list(columns),
+            'unique': info['unique'],
+            'covered_by': covered_by,
+        })
+    return report
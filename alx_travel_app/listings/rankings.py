@@ -0,0 +1,266 @@
+"""
+Precomputed top-rated and trending listing rankings.
+
+Rankings are kept per neighborhood and per room type in the Django cache:
+
+* **top_rated** orders listings by a Bayesian-weighted rating that pulls the
+  average of listings with few reviews towards the catalog-wide mean.
+* **trending** orders listings by booking velocity: recent bookings counted
+  with an exponential decay, so a booking made ``RANKING_VELOCITY_HALF_LIFE_DAYS``
+  ago weighs half as much as one made today.
+
+Booking and review writes mark the affected groups dirty and the periodic
+``refresh_rankings`` task recomputes only those. Dirty groups are collected
+in process memory when the write commits and flagged in the cache by a
+background flush every RANKING_DIRTY_FLUSH_INTERVAL seconds, which skips
+flags that are already set, so writers never touch the cache inside their
+transaction. Readers get the cached list
+unless it is older than ``RANKING_MAX_STALENESS`` seconds, in which case that
+one group is recomputed inline, so staleness is bounded even if the task
+falls behind.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models.functions import Cast, TruncDate
+from django.utils import timezone
+
+from .archive import archive_horizon
+from .flushing import BackgroundFlusher, ProcessSingleton
+from .models import ArchivedBooking, Booking, Listing
+
+
+KINDS = ['top_rated', 'trending']
+DIMENSIONS = ['neighborhood', 'room_type']
+
+DEFAULTS = {
+    'RANKING_TOP_N': 10,
+    'RANKING_PRIOR_REVIEWS': 10,
+    'RANKING_VELOCITY_HALF_LIFE_DAYS': 7,
+    'RANKING_VELOCITY_WINDOW_DAYS': 30,
+    'RANKING_MAX_STALENESS': 300,
+    'RANKING_DIRTY_FLUSH_INTERVAL': 1.0,
+}
+
+
+class UnknownGroup(ValueError):
+    """Raised for a neighborhood or room type that no listing belongs to."""
+
+
+def _setting(name):
+    return getattr(settings, name, DEFAULTS[name])
+
+
+# Group values are quoted because neighborhood names contain spaces,
+# which are not valid in memcached keys
+def _cache_key(kind, dimension, value):
+    return f"rankings:{kind}:{dimension}:{quote(value, safe='')}"
+
+
+def _dirty_key(dimension, value):
+    return f"rankings:dirty:{dimension}:{quote(value, safe='')}"
+
+
+def get_ranking(kind, dimension, value):
+    """
+    Return the ranked (listing_id, score) pairs for one group.
+
+    Serves from the cache and recomputes inline only when the cached ranking
+    is missing or older than RANKING_MAX_STALENESS. Values no listing has
+    raise UnknownGroup, so arbitrary input never adds cache entries.
+    """
+    if kind not in KINDS or dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown ranking {kind} by {dimension}")
+    cached = cache.get(_cache_key(kind, dimension, value))
+    if cached is None and not Listing.objects.filter(**{dimension: value}).exists():
+        raise UnknownGroup(f'No listings with {dimension} {value!r}.')
+    if cached is None or time.time() - cached['computed_at'] > _setting('RANKING_MAX_STALENESS'):
+        cached = _store(kind, dimension, value)
+    return cached['entries']
+
+
+class DirtyGroupBuffer(BackgroundFlusher):
+    """
+    Ranking groups marked dirty by committed writes and not yet flagged in the cache.
+    """
+    thread_name = 'ranking-dirty-flusher'
+
+    def __init__(self, flush_interval):
+        super().__init__(flush_interval)
+        self._groups = set()
+        self._lock = threading.Lock()
+
+    def add(self, groups):
+        """Buffer (dimension, value) groups once the current transaction commits."""
+        groups = set(groups)
+        transaction.on_commit(lambda: self._record(groups))
+
+    def _record(self, groups):
+        with self._lock:
+            self._groups |= groups
+        self.ensure_flusher()
+
+    def flush(self):
+        """Set the cache flags of buffered groups; returns the number of flags written."""
+        with self._lock:
+            groups, self._groups = self._groups, set()
+        if not groups:
+            return 0
+        keys = {_dirty_key(*group) for group in groups}
+        try:
+            missing = keys - set(cache.get_many(keys))
+            if missing:
+                cache.set_many(dict.fromkeys(missing, True), None)
+        except Exception:
+            with self._lock:
+                self._groups |= groups
+            raise
+        return len(missing)
+
+
+_dirty_groups = ProcessSingleton(
+    lambda: DirtyGroupBuffer(_setting('RANKING_DIRTY_FLUSH_INTERVAL'))
+)
+
+
+def mark_dirty(neighborhood, room_type):
+    """Flag the groups a listing belongs to for the next incremental refresh."""
+    _dirty_groups.get().add([('neighborhood', neighborhood), ('room_type', room_type)])
+
+
+def mark_listings_dirty(listing_ids):
+    """Flag the groups of several listings at once, e.g. after a bulk write."""
+    groups = Listing.objects.filter(pk__in=listing_ids).values_list(
+        'neighborhood', 'room_type'
+    ).distinct().order_by()
+    marked = set()
+    for neighborhood, room_type in groups:
+        marked.add(('neighborhood', neighborhood))
+        marked.add(('room_type', room_type))
+    if marked:
+        _dirty_groups.get().add(marked)
+
+
+def flush_dirty_groups():
+    """Flag this process's buffered dirty groups in the cache now."""
+    return _dirty_groups.flush()
+
+
+def refresh_rankings(full=False):
+    """
+    Recompute the rankings of dirty groups, or of every group when ``full``.
+
+    Returns the number of groups refreshed.
+    """
+    flush_dirty_groups()
+    groups = [
+        (dimension, value)
+        for dimension in DIMENSIONS
+        for value in Listing.objects.values_list(dimension, flat=True).distinct().order_by()
+    ]
+    if not full:
+        dirty = cache.get_many([_dirty_key(*group) for group in groups])
+        groups = [group for group in groups if _dirty_key(*group) in dirty]
+
+    global_mean = _global_mean_rating()
+    for dimension, value in groups:
+        # Clear the flag first so that writes landing during the refresh re-mark it
+        cache.delete(_dirty_key(dimension, value))
+        for kind in KINDS:
+            _store(kind, dimension, value, global_mean)
+    return len(groups)
+
+
+def _store(kind, dimension, value, global_mean=None):
+    """Compute one ranking and write it to the cache."""
+    if kind == 'top_rated':
+        entries = top_rated(dimension, value, global_mean)
+    else:
+        entries = trending(dimension, value)
+    ranking = {'computed_at': time.time(), 'entries': entries}
+    cache.set(_cache_key(kind, dimension, value), ranking, None)
+    return ranking
+
+
+def _global_mean_rating():
+    """Review-weighted mean rating over the whole catalog."""
+    totals = Listing.objects.filter(number_of_reviews__gt=0).aggregate(
+        points=Sum(F('number_of_reviews') * Cast('review_scores_rating', FloatField())),
+        reviews=Sum('number_of_reviews'),
+    )
+    if not totals['reviews']:
+        return 0.0
+    return totals['points'] / totals['reviews']
+
+
+def top_rated(dimension, value, global_mean=None):
+    """
+    Top listings of a group by Bayesian-weighted rating.
+
+    score = (n * R + m * C) / (n + m), where n is the listing's review count,
+    R its average rating, C the catalog-wide mean and m RANKING_PRIOR_REVIEWS.
+    """
+    if global_mean is None:
+        global_mean = _global_mean_rating()
+    prior = float(_setting('RANKING_PRIOR_REVIEWS'))
+    reviews = Cast('number_of_reviews', FloatField())
+    score = ExpressionWrapper(
+        (reviews * Cast('review_scores_rating', FloatField()) + prior * global_mean)
+        / (reviews + prior),
+        output_field=FloatField(),
+    )
+    rows = (
+        Listing.objects.filter(**{dimension: value}, number_of_reviews__gt=0)
+        .annotate(score=score)
+        .order_by('-score', 'id')
+        .values_list('id', 'score')[:_setting('RANKING_TOP_N')]
+    )
+    return [(listing_id, round(score, 4)) for listing_id, score in rows]
+
+
+def trending(dimension, value, now=None):
+    """Top listings of a group by exponentially decayed booking velocity."""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    window = timedelta(days=_setting('RANKING_VELOCITY_WINDOW_DAYS'))
+    decay = math.log(2) / _setting('RANKING_VELOCITY_HALF_LIFE_DAYS')
+
+    since = now - window
+    # Bookings are counted per listing and day, so the rows read stay bounded
+    rows = list(_daily_booking_counts(
+        Booking.objects.filter(**{f'listing__{dimension}': value}, created_at__gte=since)
+    ))
+    # Finished bookings archived within the window still count; a booking is
+    # made before its check-in, so none are older than the newest archived one
+    horizon = archive_horizon()
+    if horizon is not None and timezone.localdate(since) <= horizon:
+        listing_ids = list(Listing.objects.filter(**{dimension: value}).values_list('id', flat=True))
+        rows += _daily_booking_counts(
+            ArchivedBooking.objects.filter(listing_id__in=listing_ids, created_at__gte=since)
+        )
+    velocity = {}
+    for row in rows:
+        age = (today - row['day']).days
+        velocity[row['listing_id']] = (
+            velocity.get(row['listing_id'], 0.0) + row['bookings'] * math.exp(-decay * age)
+        )
+    ranked = sorted(velocity.items(), key=lambda item: (-item[1], item[0]))
+    return [(listing_id, round(score, 4)) for listing_id, score in ranked[:_setting('RANKING_TOP_N')]]
+
+
+def _daily_booking_counts(queryset):
+    """Non-cancelled bookings per listing and creation day."""
+    return (
+        queryset.exclude(status='cancelled')
+        .annotate(day=TruncDate('created_at'))
+        .values('listing_id', 'day')
+        .annotate(bookings=Count('id'))
+        .order_by()
+    )
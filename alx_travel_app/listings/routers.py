@@ -0,0 +1,37 @@
+"""
+Database routing for archived bookings.
+"""
+from django.conf import settings
+
+
+class BookingArchiveRouter:
+    """
+    Send ArchivedBooking to the BOOKING_ARCHIVE_DATABASE alias.
+
+    All other models are left to the default routing.
+    """
+    model_name = 'archivedbooking'
+
+    def _archive_db(self):
+        return getattr(settings, 'BOOKING_ARCHIVE_DATABASE', 'default')
+
+    def db_for_read(self, model, **hints):
+        if model._meta.model_name == self.model_name:
+            return self._archive_db()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.model_name == self.model_name:
+            return self._archive_db()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Archived rows only reference listings by id, across databases
+        if self.model_name in (obj1._meta.model_name, obj2._meta.model_name):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name == self.model_name:
+            return db == self._archive_db()
+        return None
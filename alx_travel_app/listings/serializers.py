@@ -30,10 +30,15 @@ class ListingSerializer(serializers.ModelSerializer):
             'availability_365',
             'number_of_reviews',
             'review_scores_rating',
+            'number_of_bookings',
+            'number_of_views',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'number_of_reviews', 'review_scores_rating']
+        read_only_fields = [
+            'id', 'created_at', 'updated_at', 'number_of_reviews', 'review_scores_rating',
+            'number_of_bookings', 'number_of_views',
+        ]
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -98,6 +103,15 @@ class BookingSerializer(serializers.ModelSerializer):
                     raise serializers.ValidationError({
                         'check_out': f'Minimum {listing.minimum_nights} nights required for this listing.'
                     })
+
+                # Only pending/confirmed bookings hold the listing's dates
+                overlapping = Booking.objects.overlapping(listing, check_in, check_out)
+                if self.instance is not None:
+                    overlapping = overlapping.exclude(pk=self.instance.pk)
+                if overlapping.exists():
+                    raise serializers.ValidationError({
+                        'check_in': 'The listing is already booked for these dates.'
+                    })
         
         return data
     
@@ -119,3 +133,28 @@ class BookingSerializer(serializers.ModelSerializer):
         
         return super().create(validated_data)
 
+
+class ReviewSerializer(serializers.ModelSerializer):
+    """
+    Serializer for Review model.
+    """
+    
+    class Meta:
+        model = Review
+        fields = [
+            'id',
+            'listing',
+            'reviewer_name',
+            'reviewer_id',
+            'comments',
+            'rating',
+            'accuracy_rating',
+            'cleanliness_rating',
+            'checkin_rating',
+            'communication_rating',
+            'location_rating',
+            'value_rating',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
@@ -0,0 +1,28 @@
+"""
+Signal handlers that keep derived listing data in step with writes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import increment_counter
+from .models import Booking, Review
+from .rankings import mark_dirty
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=Review)
+def mark_rankings_dirty(sender, instance, **kwargs):
+    """Queue the listing's ranking groups for the next incremental refresh."""
+    listing = instance.listing
+    mark_dirty(listing.neighborhood, listing.room_type)
+
+
+@receiver(post_save, sender=Booking)
+def count_new_booking(sender, instance, created, **kwargs):
+    if created:
+        increment_counter(instance.listing_id, 'number_of_bookings')
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_deleted_booking(sender, instance, **kwargs):
+    increment_counter(instance.listing_id, 'number_of_bookings', -1)
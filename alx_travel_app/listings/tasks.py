@@ -0,0 +1,34 @@
+"""
+Celery tasks for the listings app.
+"""
+from celery import shared_task
+from django.conf import settings
+
+from .archive import archive_bookings as archive_finished_bookings
+from .counters import reconcile_listing_counters as reconcile_counters
+from .lifecycle import run_booking_lifecycle
+from .rankings import refresh_rankings as refresh_ranking_groups
+
+
+@shared_task
+def archive_bookings():
+    """Move finished bookings older than BOOKING_ARCHIVE_MONTHS to the archive."""
+    return archive_finished_bookings(settings.BOOKING_ARCHIVE_MONTHS)
+
+
+@shared_task
+def update_booking_statuses():
+    """Periodic booking lifecycle run; returns the count per transition."""
+    return run_booking_lifecycle()
+
+
+@shared_task
+def reconcile_listing_counters():
+    """Recompute listing counters from source rows, repairing deltas lost in crashes."""
+    return reconcile_counters()
+
+
+@shared_task
+def refresh_rankings(full=False):
+    """Recompute the top-rated and trending rankings of dirty (or all) groups."""
+    return refresh_ranking_groups(full=full)
@@ -1,4 +1,560 @@
-from django.test import TestCase
+import itertools
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
 
+from .archive import archive_bookings
+from .catalog import ListingCatalog, SearchResults
+from . import counters, flushing, impressions
+from .counters import CounterBuffer, reconcile_listing_counters
+from .impressions import IMPRESSION, VIEW, ImpressionBuffer
+from .guest_history import guest_booking_history
+from .ingestion import ingest_reviews
+from .lifecycle import complete_finished_bookings, expire_stale_pending
+from .models import ArchivedBooking, Booking, Listing, ListingImpressionCount, Review
+from .query_plans import check_hot_paths
+from .throttling import (
+    CONCURRENCY_SCOPE, ConcurrencyLimitMiddleware, LocalBucketStore, TokenBucketThrottle,
+)
+
+
+_host_ids = itertools.count(1)
+
+
+def make_listing(**fields):
+    """Create a listing, filling in the fields a test does not care about."""
+    values = {
+        'title': 'Test listing',
+        'description': 'A place to stay.',
+        'host_name': 'Host',
+        'host_id': f'test-host-{next(_host_ids)}',
+        'neighborhood': 'Downtown',
+        'room_type': 'entire_home',
+        'price': Decimal('100.00'),
+        **fields,
+    }
+    return Listing.objects.create(**values)
+
+
+def make_booking(listing, check_in, nights=2, **fields):
+    """Create a booking of ``nights`` nights from ``check_in``."""
+    values = {
+        'guest_name': 'Guest',
+        'guest_email': 'guest@example.com',
+        'check_out': check_in + timedelta(days=nights),
+        'price_per_night': Decimal('100.00'),
+        'total_price': Decimal('100.00') * nights,
+        **fields,
+    }
+    return Booking.objects.create(listing=listing, check_in=check_in, **values)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Fails when an ORM hot path stops using its index (see listings.query_plans).
+    """
+
+    def test_hot_paths_use_indexes(self):
+        for result in check_hot_paths():
+            with self.subTest(path=result.path.name):
+                self.assertEqual(result.problems, [])
+
+
+class ReviewIngestionTests(TestCase):
+    """
+    Deduplication, upserts and rating refreshes of listings.ingestion.
+    """
+
+    def setUp(self):
+        self.listing = make_listing()
+
+    def records(self):
+        return [
+            {'listing_id': self.listing.pk, 'reviewer_id': 'r1', 'reviewer_name': 'Ann',
+             'comments': 'first', 'rating': 3},
+            # Same key later in the batch: the last occurrence wins
+            {'listing_id': self.listing.pk, 'reviewer_id': 'r1', 'reviewer_name': 'Ann',
+             'comments': 'second', 'rating': 5},
+            {'listing_id': self.listing.pk, 'reviewer_name': 'Anon', 'comments': 'nice', 'rating': 4},
+            {'listing_id': self.listing.pk, 'reviewer_name': 'Anon', 'comments': 'nice', 'rating': 4},
+            {'listing_id': self.listing.pk, 'reviewer_name': 'Bob', 'comments': 'bad', 'rating': 9},
+            {'listing_id': 999999, 'reviewer_id': 'r2', 'reviewer_name': 'Cy', 'comments': 'x', 'rating': 4},
+        ]
+
+    def test_first_import_deduplicates_and_refreshes_ratings(self):
+        stats = ingest_reviews(self.records())
+
+        self.assertEqual(
+            (stats.received, stats.created, stats.updated, stats.duplicates, stats.rejected),
+            (6, 2, 0, 2, 2),
+        )
+        self.assertEqual(Review.objects.get(reviewer_id='r1').comments, 'second')
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.number_of_reviews, 2)
+        self.assertEqual(self.listing.review_scores_rating, Decimal('4.50'))
+
+    def test_reimport_creates_nothing(self):
+        ingest_reviews(self.records())
+        stats = ingest_reviews(self.records())
+
+        # Two in-batch duplicates, plus the stored keyed and anonymous reviews
+        self.assertEqual((stats.created, stats.updated, stats.duplicates), (0, 1, 4))
+        self.assertEqual(Review.objects.filter(listing=self.listing).count(), 2)
+        self.assertEqual(Review.objects.filter(reviewer_id__isnull=True).count(), 1)
+
+    def test_changed_review_is_updated_in_place(self):
+        ingest_reviews(self.records())
+        stats = ingest_reviews([
+            {'listing_id': self.listing.pk, 'reviewer_id': 'r1', 'reviewer_name': 'Ann',
+             'comments': 'changed my mind', 'rating': 1},
+        ])
+
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+        review = Review.objects.get(reviewer_id='r1')
+        self.assertEqual((review.comments, review.rating), ('changed my mind', 1))
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.review_scores_rating, Decimal('2.50'))
+
+
+class BookingLifecycleTests(TestCase):
+    """
+    Status transitions of listings.lifecycle.
+    """
+
+    def setUp(self):
+        self.listing = make_listing()
+        self.today = date(2024, 6, 15)
+
+    def test_completes_confirmed_bookings_after_check_out(self):
+        finished = make_booking(self.listing, date(2024, 6, 1), status='confirmed')
+        leaving_today = make_booking(self.listing, date(2024, 6, 13), status='confirmed')
+        pending = make_booking(self.listing, date(2024, 5, 1), status='pending')
+
+        self.assertEqual(complete_finished_bookings(today=self.today, batch_size=1), 1)
+
+        statuses = dict(Booking.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[finished.pk], 'completed')
+        self.assertEqual(statuses[leaving_today.pk], 'confirmed')
+        self.assertEqual(statuses[pending.pk], 'pending')
+        # Idempotent: nothing is left to move
+        self.assertEqual(complete_finished_bookings(today=self.today), 0)
+
+    def test_cancels_stale_pending_bookings(self):
+        now = timezone.now()
+        stale = [make_booking(self.listing, date(2030, 1, 1 + 3 * i)) for i in range(3)]
+        fresh = make_booking(self.listing, date(2030, 2, 1))
+        Booking.objects.filter(pk__in=[booking.pk for booking in stale]).update(
+            created_at=now - timedelta(hours=25)
+        )
+
+        self.assertEqual(expire_stale_pending(now=now, ttl=timedelta(hours=24), batch_size=2), 3)
+
+        self.assertEqual(
+            set(Booking.objects.filter(status='cancelled').values_list('pk', flat=True)),
+            {booking.pk for booking in stale},
+        )
+        self.assertEqual(Booking.objects.get(pk=fresh.pk).status, 'pending')
+        # Cancelled bookings release their dates
+        self.assertFalse(
+            Booking.objects.overlapping(self.listing, date(2030, 1, 1), date(2030, 1, 2)).exists()
+        )
+
+
+class ListingCatalogTests(TestCase):
+    """
+    Snapshot builds, refreshes and searches of listings.catalog.
+    """
+
+    def setUp(self):
+        self.cheap = make_listing(price=Decimal('50.00'), accommodates=2, review_scores_rating=Decimal('4.00'))
+        self.mid = make_listing(price=Decimal('80.00'), accommodates=4, room_type='private_room')
+        self.pricey = make_listing(price=Decimal('200.00'), accommodates=6, neighborhood='Harbor',
+                                   review_scores_rating=Decimal('4.90'))
+        self.catalog = ListingCatalog.build()
+
+    def test_search_filters_and_orders(self):
+        self.assertEqual(self.catalog.search(), [self.cheap.pk, self.mid.pk, self.pricey.pk])
+        self.assertEqual(self.catalog.search('-price'), [self.pricey.pk, self.mid.pk, self.cheap.pk])
+        # Unrated listings sort last
+        self.assertEqual(self.catalog.search('-rating'), [self.pricey.pk, self.cheap.pk, self.mid.pk])
+        self.assertEqual(self.catalog.search(room_type='entire_home', min_accommodates=3), [self.pricey.pk])
+        self.assertEqual(self.catalog.search(min_rating=4.5), [self.pricey.pk])
+        self.assertEqual(self.catalog.search(neighborhood='Nowhere'), [])
+        self.assertEqual(self.catalog.search(offset=1, limit=1), [self.mid.pk])
+        self.assertEqual(self.catalog.count(max_price=100), 2)
+
+    def test_refresh_merges_updated_rows(self):
+        self.mid.price = Decimal('300.00')
+        self.mid.save()
+        added = make_listing(price=Decimal('10.00'))
+
+        catalog = self.catalog.refreshed()
+
+        self.assertEqual(catalog.search(), [added.pk, self.cheap.pk, self.pricey.pk, self.mid.pk])
+        # The previous snapshot is left untouched
+        self.assertEqual(self.catalog.search(), [self.cheap.pk, self.mid.pk, self.pricey.pk])
+
+    def test_refresh_drops_deletion_offset_by_insert(self):
+        # An insert whose updated_at falls before the refresh window keeps the
+        # row count equal; the id sum still gives the deletion away
+        self.cheap.delete()
+        late = make_listing(price=Decimal('60.00'))
+        Listing.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+        catalog = self.catalog.refreshed()
+
+        self.assertEqual(sorted(catalog.ids.tolist()), sorted([self.mid.pk, self.pricey.pk, late.pk]))
+
+    def test_search_results_count_and_slice(self):
+        results = SearchResults(self.catalog, '-price', max_price=100)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0:1], [self.mid.pk])
+        self.assertEqual(results[1:10], [self.cheap.pk])
+        with self.assertRaises(TypeError):
+            results[0]
+
+    def test_list_view_paginates_catalog_results(self):
+        for _ in range(11):
+            make_listing(price=Decimal('500.00'))
+
+        with mock.patch('listings.catalog._catalog', None), \
+                mock.patch('listings.views.record_impressions') as record_impressions:
+            response = self.client.get('/api/listings/', {'page': 2, 'ordering': 'price'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 14)
+        self.assertEqual(len(response.data['results']), 4)
+        record_impressions.assert_called_once_with([row['id'] for row in response.data['results']])
+
+
+class ThrottlingTests(TestCase):
+    """
+    Token buckets and concurrency shedding of listings.throttling.
+    """
+
+    def setUp(self):
+        self.store = LocalBucketStore(max_buckets=2)
+        patcher = mock.patch('listings.throttling._store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bucket_allows_burst_then_refills(self):
+        consume = lambda now: self.store.consume('client', 3, 1.0, now)
+
+        self.assertEqual([consume(0)[0] for _ in range(3)], [True, True, True])
+        self.assertEqual(consume(0), (False, 1.0))
+        self.assertEqual(consume(0.5), (False, 0.5))
+        self.assertTrue(consume(1.0)[0])
+
+    def test_least_recently_used_bucket_is_evicted(self):
+        for key in ['a', 'b', 'a', 'c']:
+            self.store.consume(key, 1, 1.0, 0)
+
+        # 'a' was kept with its empty bucket, 'b' was evicted and starts full again
+        self.assertFalse(self.store.consume('a', 1, 1.0, 0)[0])
+        self.assertTrue(self.store.consume('b', 1, 1.0, 0)[0])
+
+    def test_api_rejects_excess_requests_whatever_the_forwarded_for(self):
+        rates = {'search': '2/min'}
+        with mock.patch.dict(TokenBucketThrottle.THROTTLE_RATES, rates), \
+                mock.patch('listings.catalog._catalog', None), \
+                mock.patch('listings.views.record_impressions'):
+            statuses = [
+                self.client.get('/api/listings/', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+                for i in range(3)
+            ]
+
+        self.assertEqual([response.status_code for response in statuses], [200, 200, 429])
+        self.assertIn('Retry-After', statuses[-1])
+        self.assertEqual(self.store.rejections(), {'search': 1})
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=1, CONCURRENCY_QUEUE_TIMEOUT=0.01)
+    def test_middleware_sheds_requests_over_the_limit(self):
+        middleware = ConcurrencyLimitMiddleware(lambda request: HttpResponse('ok'))
+        request = RequestFactory().get('/api/listings/')
+
+        self.assertEqual(middleware(request).status_code, 200)
+        middleware.slots.acquire()
+        try:
+            response = middleware(request)
+        finally:
+            middleware.slots.release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.store.rejections(), {CONCURRENCY_SCOPE: 1})
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=0)
+    def test_middleware_disabled_without_limit(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ConcurrencyLimitMiddleware(lambda request: HttpResponse('ok'))
+
+
+class GuestEmailTests(TestCase):
+    """
+    Guest email normalization and case-insensitive history lookups.
+    """
+
+    def setUp(self):
+        self.listing = make_listing()
+
+    def test_save_normalizes_email(self):
+        booking = make_booking(self.listing, date(2030, 1, 1), guest_email='  Ann@Example.COM ')
+
+        self.assertEqual(Booking.objects.get(pk=booking.pk).guest_email, 'ann@example.com')
+
+    def test_command_normalizes_emails_written_around_save(self):
+        # Both paths skip Booking.save()
+        bulk, = Booking.objects.bulk_create([Booking(
+            listing=self.listing, guest_name='Ann', guest_email='Ann@Example.com',
+            check_in=date(2030, 1, 1), check_out=date(2030, 1, 3),
+            price_per_night=Decimal('100.00'), total_price=Decimal('200.00'),
+        )])
+        updated = make_booking(self.listing, date(2030, 2, 1))
+        Booking.objects.filter(pk=updated.pk).update(guest_email=' BOB@example.com ')
+        untouched = make_booking(self.listing, date(2030, 3, 1), guest_email='cy@example.com')
+
+        out = StringIO()
+        call_command('normalize_guest_emails', batch_size=1, stdout=out)
+
+        self.assertIn('Normalized 2 guest emails.', out.getvalue())
+        self.assertEqual(
+            dict(Booking.objects.values_list('pk', 'guest_email')),
+            {bulk.pk: 'ann@example.com', updated.pk: 'bob@example.com',
+             untouched.pk: 'cy@example.com'},
+        )
+
+    def test_history_lookup_ignores_case_and_whitespace(self):
+        booking = make_booking(self.listing, date(2030, 1, 1), guest_email='Ann@Example.com')
+
+        rows, next_cursor = guest_booking_history(' ANN@example.COM')
+
+        self.assertEqual([row['id'] for row in rows], [booking.pk])
+        self.assertIsNone(next_cursor)
+
+
+class GuestHistoryTests(TestCase):
+    """
+    Keyset pagination of a guest's history across hot and archived bookings.
+    """
+
+    def setUp(self):
+        self.beach = make_listing(title='Beach house')
+        self.loft = make_listing(title='City loft')
+        book = lambda listing, check_in, status: make_booking(
+            listing, check_in, guest_email='ann@example.com', status=status
+        )
+        # Completed bookings before 2024-01-15 are archived; the confirmed
+        # 2023 one stays hot and has to interleave with the archive
+        self.bookings = [
+            book(self.beach, date(2023, 1, 10), 'completed'),
+            book(self.loft, date(2023, 2, 10), 'confirmed'),
+            book(self.loft, date(2023, 3, 10), 'cancelled'),
+            book(self.beach, date(2023, 5, 10), 'completed'),
+            book(self.loft, date(2024, 3, 10), 'completed'),
+            book(self.beach, date(2024, 6, 1), 'confirmed'),
+        ]
+        make_booking(self.beach, date(2023, 4, 10), guest_email='bob@example.com', status='completed')
+        self.assertEqual(archive_bookings(months=5, today=date(2024, 6, 15)), 4)
+
+    def pages(self, page_size):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = guest_booking_history('ann@example.com', cursor, page_size)
+            pages.append(rows)
+            if cursor is None:
+                return pages
+
+    def test_pages_interleave_hot_and_archived_rows(self):
+        pages = self.pages(page_size=2)
+
+        self.assertEqual([len(rows) for rows in pages], [2, 2, 2])
+        rows = [row for page in pages for row in page]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [booking.pk for booking in reversed(self.bookings)],
+        )
+        self.assertEqual(
+            [row['listing_title'] for row in rows],
+            [booking.listing.title for booking in reversed(self.bookings)],
+        )
+
+    def test_booking_in_both_tables_is_served_once(self):
+        # A booking caught between copy and delete by an archive batch
+        moving = self.bookings[1]
+        moving.status = 'completed'
+        ArchivedBooking.from_booking(moving).save()
+
+        ids = [row['id'] for page in self.pages(page_size=4) for row in page]
+
+        self.assertEqual(ids, [booking.pk for booking in reversed(self.bookings)])
+
+
+class CounterBufferTests(TestCase):
+    """
+    Buffered listing counter deltas and their reconciliation.
+    """
+
+    def setUp(self):
+        self.listing = make_listing()
+        self.buffer = CounterBuffer(flush_interval=3600)
+        # Flushed by hand instead of from the background thread
+        self.buffer.ensure_flusher = mock.Mock()
+
+    def counters(self):
+        self.listing.refresh_from_db()
+        return (self.listing.number_of_bookings, self.listing.number_of_views,
+                self.listing.number_of_reviews)
+
+    def test_deltas_are_recorded_on_commit_and_coalesced(self):
+        Review.objects.create(listing=self.listing, reviewer_name='Ann', comments='ok', rating=4)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.buffer.add(self.listing.pk, number_of_bookings=1, number_of_views=2)
+        self.assertEqual(self.buffer.pending(), 0)
+        for callback in callbacks:
+            callback()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.add(self.listing.pk, number_of_bookings=1)
+            self.buffer.mark_ratings(self.listing.pk)
+
+        self.assertEqual(self.buffer.pending(), 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.counters(), (2, 2, 1))
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_decrements_stop_at_zero(self):
+        self.buffer._record(self.listing.pk, {'number_of_bookings': -3})
+        self.buffer.flush()
+
+        self.assertEqual(self.counters()[0], 0)
+
+    def test_unknown_counter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.buffer.add(self.listing.pk, number_of_reviews=1)
+
+    def test_failed_flush_is_retried(self):
+        self.buffer._record(self.listing.pk, {'number_of_views': 5}, ratings=True)
+        with mock.patch('listings.counters.refresh_listing_ratings', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+
+        # The failed transaction rolled back and the deltas were put back
+        self.assertEqual(self.counters()[1], 0)
+        self.assertEqual(self.buffer.pending(), 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.counters()[1], 5)
+
+    def test_reconcile_recomputes_from_source_rows(self):
+        make_booking(self.listing, date(2030, 1, 1))
+        old = make_booking(self.listing, date(2023, 1, 1), status='completed')
+        archive_bookings(months=1, today=date(2024, 1, 1))
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        ListingImpressionCount.objects.bulk_create([
+            ListingImpressionCount(listing=self.listing, hour=hour, views=3),
+            ListingImpressionCount(listing=self.listing, hour=hour - timedelta(hours=1), views=4),
+        ])
+        Listing.objects.filter(pk=self.listing.pk).update(
+            number_of_bookings=10, number_of_views=10, number_of_reviews=10
+        )
+
+        self.assertEqual(reconcile_listing_counters([self.listing.pk]), 1)
+
+        self.assertTrue(ArchivedBooking.objects.filter(pk=old.pk).exists())
+        self.assertEqual(self.counters(), (2, 7, 0))
+
+
+class ImpressionBufferTests(TestCase):
+    """
+    Flushing, retries and drop accounting of listings.impressions.
+    """
+
+    def setUp(self):
+        self.listing = make_listing()
+        self.buffer = ImpressionBuffer(capacity=100, flush_interval=3600)
+        self.buffer.ensure_flusher = mock.Mock()
+        patcher = mock.patch('listings.impressions.increment_counter')
+        self.increment_counter = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, listing_id, views=0, impressions=0):
+        for _ in range(views):
+            self.buffer.record(listing_id, VIEW)
+        for _ in range(impressions):
+            self.buffer.record(listing_id, IMPRESSION)
+
+    def totals(self):
+        return impressions.total_counts(self.listing.pk)
+
+    def test_flush_adds_to_hourly_counts(self):
+        self.record(self.listing.pk, views=2, impressions=3)
+        self.assertEqual(self.buffer.flush(), 5)
+        self.record(self.listing.pk, views=1)
+        self.assertEqual(self.buffer.flush(), 1)
+
+        self.assertEqual(ListingImpressionCount.objects.count(), 1)
+        self.assertEqual(self.totals(), {'views': 3, 'impressions': 3})
+        self.assertEqual(self.increment_counter.call_args_list, [
+            mock.call(self.listing.pk, 'number_of_views', 2),
+            mock.call(self.listing.pk, 'number_of_views', 1),
+        ])
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_failed_upsert_is_retried(self):
+        self.record(self.listing.pk, views=1, impressions=2)
+        with mock.patch('listings.impressions._upsert_hourly_counts', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.stats()['buffered'], 3)
+
+        self.record(self.listing.pk, impressions=1)
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(self.totals(), {'views': 1, 'impressions': 3})
+        self.assertEqual(self.buffer.stats()['dropped'], 0)
+
+    def test_events_of_deleted_listings_are_dropped(self):
+        deleted = make_listing()
+        self.record(deleted.pk, views=2)
+        self.record(self.listing.pk, impressions=1)
+        deleted.delete()
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.buffer.stats()['dropped'], 2)
+        self.assertEqual(self.totals(), {'views': 0, 'impressions': 1})
+
+    def test_integrity_error_is_not_retried(self):
+        self.record(self.listing.pk, views=2)
+        with mock.patch('listings.impressions._upsert_hourly_counts', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.buffer.flush()
+
+        self.assertEqual(self.buffer.stats()['buffered'], 0)
+        self.assertEqual(self.buffer.stats()['dropped'], 2)
+        self.record(self.listing.pk, views=1)
+        self.assertEqual(self.buffer.flush(), 1)
+
+    def test_impressions_flush_before_counters_at_exit(self):
+        self.assertLess(impressions._buffer.exit_stage, counters._buffer.exit_stage)
+
+        flushed = []
+        buffer = lambda name: mock.Mock(
+            thread_name=name, flush=mock.Mock(side_effect=lambda: flushed.append(name))
+        )
+        with mock.patch('listings.flushing._singletons', []):
+            # Created in the opposite order to their exit stages
+            late = flushing.ProcessSingleton(lambda: buffer('late'), exit_stage=1)
+            early = flushing.ProcessSingleton(lambda: buffer('early'), exit_stage=0)
+            flushing.ProcessSingleton(lambda: buffer('unused'))
+            late.get()
+            early.get()
+            flushing.flush_all()
+
+        self.assertEqual(flushed, ['early', 'late'])
@@ -0,0 +1,216 @@
+"""
+Request throttling and admission control for the public API.
+
+Two layers keep abusive or excessive traffic away from the database:
+
+* ``TokenBucketThrottle`` is a DRF throttle that gives every client one token
+  bucket per endpoint class (``throttle_scope`` on the view). Rejected
+  requests get a 429 with ``Retry-After``.
+* ``ConcurrencyLimitMiddleware`` caps how many requests a process serves at
+  once and sheds the excess with a 503 before any view runs.
+
+Bucket state lives either in process memory ('local' backend) or in a Django
+cache shared by all workers ('cache' backend), selected by THROTTLE_BACKEND.
+Both backends count rejections per bucket scope; see ``rejection_counts()``.
+"""
+import math
+import threading
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import ScopedRateThrottle
+
+
+CONCURRENCY_SCOPE = 'concurrency'
+
+
+def _take_token(tokens, updated, capacity, refill_rate, now):
+    """
+    Refill a bucket up to ``now`` and try to take one token from it.
+
+    Returns (tokens left, allowed, seconds until the next token).
+    """
+    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0.0
+    return tokens, False, (1 - tokens) / refill_rate
+
+
+class LocalBucketStore:
+    """
+    Token buckets held in process memory.
+
+    Buckets are kept in least-recently-used order and the oldest is evicted
+    once the store holds ``max_buckets``, so memory stays bounded and every
+    request costs O(1) however many clients are seen. An evicted client
+    simply starts again with a full bucket.
+    """
+    name = 'local'
+
+    def __init__(self, max_buckets=10000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._rejections = Counter()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens, allowed, wait = _take_token(tokens, updated, capacity, refill_rate, now)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def record_rejection(self, scope):
+        with self._lock:
+            self._rejections[scope] += 1
+
+    def rejections(self):
+        with self._lock:
+            return dict(self._rejections)
+
+
+class CacheBucketStore:
+    """
+    Token buckets held in a Django cache shared by every worker.
+
+    The read-modify-write of a bucket is not atomic, so concurrent requests
+    from one client can occasionally both get the last token; like DRF's own
+    cache-based throttles, this trades exactness for a single round trip.
+    """
+    name = 'cache'
+    rejection_key_format = 'throttle_rejections_%s'
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def consume(self, key, capacity, refill_rate, now):
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens, allowed, wait = _take_token(tokens, updated, capacity, refill_rate, now)
+        # Once the bucket would be full again its state can simply expire
+        timeout = math.ceil((capacity - tokens) / refill_rate) + 1
+        self.cache.set(key, (tokens, now), timeout)
+        return allowed, wait
+
+    def record_rejection(self, scope):
+        key = self.rejection_key_format % scope
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # The counter was evicted between add() and incr()
+            self.cache.set(key, 1, None)
+
+    def rejections(self):
+        scopes = [*TokenBucketThrottle.THROTTLE_RATES, CONCURRENCY_SCOPE]
+        counts = self.cache.get_many([self.rejection_key_format % scope for scope in scopes])
+        return {
+            scope: counts[self.rejection_key_format % scope]
+            for scope in scopes
+            if self.rejection_key_format % scope in counts
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Return the process-wide bucket store for the configured THROTTLE_BACKEND."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = getattr(settings, 'THROTTLE_BACKEND', 'local')
+                if backend == 'local':
+                    _store = LocalBucketStore()
+                elif backend == 'cache':
+                    _store = CacheBucketStore(getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default'))
+                else:
+                    raise ImproperlyConfigured(f"Unknown THROTTLE_BACKEND '{backend}'")
+    return _store
+
+
+def rejection_counts():
+    """Number of rejected requests per bucket scope, including concurrency shedding."""
+    return get_bucket_store().rejections()
+
+
+class TokenBucketThrottle(ScopedRateThrottle):
+    """
+    Token-bucket throttle keyed by client and endpoint class.
+
+    A rate of 'N/period' gives each client a bucket of N tokens refilled at
+    N per period, so short bursts of up to N requests pass while the sustained
+    rate stays at N/period. Views choose their endpoint class with
+    ``throttle_scope``; unsafe requests use ``throttle_write_scope`` when the
+    view defines one. Views without a scope share the 'default' bucket.
+    """
+    default_scope = 'default'
+    write_scope_attr = 'throttle_write_scope'
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.retry_after = None
+        if self.num_requests is None:
+            return True
+
+        store = get_bucket_store()
+        allowed, self.retry_after = store.consume(
+            self.get_cache_key(request, view),
+            self.num_requests,
+            self.num_requests / self.duration,
+            self.timer(),
+        )
+        if not allowed:
+            store.record_rejection(self.scope)
+        return allowed
+
+    def get_scope(self, request, view):
+        """Endpoint class of the request, used to pick the bucket and its rate."""
+        if request.method not in SAFE_METHODS:
+            write_scope = getattr(view, self.write_scope_attr, None)
+            if write_scope:
+                return write_scope
+        return getattr(view, self.scope_attr, None) or self.default_scope
+
+    def wait(self):
+        return self.retry_after
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Cap the number of requests served concurrently by this process.
+
+    Requests that cannot get a slot within CONCURRENCY_QUEUE_TIMEOUT seconds
+    are answered with a 503 before they reach a view or the database.
+    Disabled when MAX_CONCURRENT_REQUESTS is unset or 0.
+    """
+
+    def __init__(self, get_response):
+        limit = getattr(settings, 'MAX_CONCURRENT_REQUESTS', 0)
+        if not limit:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slots = threading.BoundedSemaphore(limit)
+        self.timeout = getattr(settings, 'CONCURRENCY_QUEUE_TIMEOUT', 0.5)
+
+    def __call__(self, request):
+        if not self.slots.acquire(timeout=self.timeout):
+            get_bucket_store().record_rejection(CONCURRENCY_SCOPE)
+            response = JsonResponse(
+                {'detail': 'Server is busy, please retry shortly.'}, status=503
+            )
+            response['Retry-After'] = '1'
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
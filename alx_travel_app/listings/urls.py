@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+router.register('listings', views.ListingViewSet, basename='listing')
+# Anonymous booking and review writes exist only as load test targets
+if settings.LOAD_TEST_ENDPOINTS:
+    router.register('bookings', views.BookingViewSet, basename='booking')
+    router.register('reviews', views.ReviewViewSet, basename='review')
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('guests/history/', views.GuestHistoryView.as_view(), name='guest-history'),
+    path('impressions/buffer/', views.ImpressionBufferStatsView.as_view(), name='impression-buffer'),
+    path('rankings/top-rated/', views.RankingView.as_view(kind='top_rated'), name='rankings-top-rated'),
+    path('rankings/trending/', views.RankingView.as_view(kind='trending'), name='rankings-trending'),
+    path('throttle-stats/', views.ThrottleStatsView.as_view(), name='throttle-stats'),
+]
@@ -1,4 +1,212 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .catalog import SORT_ORDERS, SearchResults, get_catalog
+from .guest_history import DEFAULT_PAGE_SIZE, InvalidCursor, guest_booking_history
+from .impressions import (
+    get_impression_buffer, hourly_counts, record_impressions, record_view, total_counts,
+)
+from .models import Booking, Listing, Review, normalize_guest_email
+from .rankings import DIMENSIONS, UnknownGroup, get_ranking
+from .serializers import BookingSerializer, ListingSerializer, ReviewSerializer
+from .throttling import get_bucket_store, rejection_counts
+
+
+class ThrottleStatsView(APIView):
+    """
+    Rejection counters for each throttle bucket scope.
+    """
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({
+            'backend': get_bucket_store().name,
+            'rejections': rejection_counts(),
+        })
+
+
+class ListingViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Listing search and detail reads.
+
+    Searches are answered from the in-memory catalog snapshot and count a
+    search impression for every listing on the returned page; detail reads
+    count a view. Both go through the impression buffer, never a row write.
+    """
+    queryset = Listing.objects.all()
+    serializer_class = ListingSerializer
+    throttle_scope = 'search'
+    MAX_STATS_HOURS = 24 * 90
+
+    # Query parameter -> (catalog search argument, parser)
+    SEARCH_FILTERS = {
+        'neighborhood': ('neighborhood', str),
+        'room_type': ('room_type', str),
+        'min_price': ('min_price', float),
+        'max_price': ('max_price', float),
+        'min_accommodates': ('min_accommodates', int),
+        'min_rating': ('min_rating', float),
+    }
+
+    def list(self, request):
+        filters = {}
+        for param, (argument, parse) in self.SEARCH_FILTERS.items():
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    filters[argument] = parse(value)
+                except ValueError:
+                    raise ValidationError({param: 'Invalid value.'})
+        ordering = request.query_params.get('ordering', 'price')
+        if ordering not in SORT_ORDERS:
+            raise ValidationError({'ordering': 'Choose one of: ' + ', '.join(SORT_ORDERS)})
+
+        page = self.paginate_queryset(SearchResults(get_catalog(), ordering, **filters))
+        listings = Listing.objects.in_bulk(page)
+        # Listings deleted since the last catalog refresh are skipped
+        results = [listings[listing_id] for listing_id in page if listing_id in listings]
+        record_impressions([listing.pk for listing in results])
+        return self.get_paginated_response(self.get_serializer(results, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        listing = self.get_object()
+        record_view(listing.pk)
+        return Response(self.get_serializer(listing).data)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Hourly views and search impressions over the last ``hours`` hours (default 24)."""
+        listing = self.get_object()
+        try:
+            hours = min(max(int(request.query_params.get('hours', 24)), 1), self.MAX_STATS_HOURS)
+        except ValueError:
+            raise ValidationError({'hours': 'Must be an integer.'})
+        since = timezone.now() - timedelta(hours=hours)
+        return Response({
+            'listing': listing.pk,
+            'totals': total_counts(listing.pk, since=since),
+            'hourly': hourly_counts(listing.pk, since=since),
+        })
+
+
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """Whether the listing is free from ``check_in`` to ``check_out``."""
+        listing = self.get_object()
+        check_in = parse_date(request.query_params.get('check_in') or '')
+        check_out = parse_date(request.query_params.get('check_out') or '')
+        if not check_in or not check_out or check_out <= check_in:
+            raise ValidationError('Provide check_in and check_out dates (YYYY-MM-DD), check_out after check_in.')
+        available = not Booking.objects.overlapping(listing, check_in, check_out).exists()
+        return Response({
+            'listing': listing.pk,
+            'check_in': check_in,
+            'check_out': check_out,
+            'available': available,
+        })
+
+
+class BookingViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """
+    Create bookings.
+
+    Bookings hold guest contact details and the API is open, so they are not
+    readable here; guests see their own through GuestHistoryView.
+    """
+    queryset = Booking.objects.select_related('listing')
+    serializer_class = BookingSerializer
+    throttle_write_scope = 'booking_write'
+
+
+class ReviewViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Post reviews and list them, optionally for one listing (``?listing=<id>``).
+    """
+    serializer_class = ReviewSerializer
+
+    def get_queryset(self):
+        queryset = Review.objects.all()
+        listing = self.request.query_params.get('listing')
+        if listing:
+            if not listing.isdigit():
+                raise ValidationError({'listing': 'Must be a listing id.'})
+            queryset = queryset.filter(listing_id=listing)
+        return queryset
+
+
+class ImpressionBufferStatsView(APIView):
+    """
+    Fill level and recorded/flushed/dropped counts of this process's impression buffer.
+    """
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response(get_impression_buffer().stats())
+
+
+class RankingView(APIView):
+    """
+    Precomputed top-rated or trending listings for one neighborhood or room type.
+
+    Exactly one of the ``neighborhood`` or ``room_type`` query parameters selects the group.
+    """
+    kind = None
+    throttle_scope = 'search'
+
+    def get(self, request):
+        groups = [(dimension, request.query_params[dimension])
+                  for dimension in DIMENSIONS if request.query_params.get(dimension)]
+        if len(groups) != 1:
+            raise ValidationError('Provide exactly one of: ' + ', '.join(DIMENSIONS))
+        dimension, value = groups[0]
+
+        try:
+            entries = get_ranking(self.kind, dimension, value)
+        except UnknownGroup as exc:
+            raise NotFound(str(exc))
+        listings = Listing.objects.in_bulk([listing_id for listing_id, _ in entries])
+        results = []
+        for listing_id, score in entries:
+            # Listings deleted since the ranking was computed are skipped
+            if listing_id in listings:
+                data = ListingSerializer(listings[listing_id]).data
+                data['score'] = score
+                results.append(data)
+        record_impressions([data['id'] for data in results])
+        return Response({dimension: value, 'results': results})
+
+
+class GuestHistoryView(APIView):
+    """
+    A guest's bookings, newest check-in first, with keyset pagination.
+
+    Guests see their own bookings; staff may look up any guest with ``?email=``.
+    Pass the returned ``next`` value as ``?cursor=`` to fetch the following page.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        email = request.query_params.get('email') or request.user.email
+        if not email:
+            raise ValidationError('No email to look up.')
+        if not request.user.is_staff and normalize_guest_email(email) != normalize_guest_email(request.user.email):
+            raise PermissionDenied('You can only view your own bookings.')
+
+        try:
+            page_size = int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE))
+            results, next_cursor = guest_booking_history(
+                email, request.query_params.get('cursor'), page_size
+            )
+        except (InvalidCursor, ValueError) as exc:
+            raise ValidationError(str(exc))
+        return Response({'next': next_cursor, 'results': results})